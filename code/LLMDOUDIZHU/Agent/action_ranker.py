@@ -0,0 +1,221 @@
+"""
+动作排序：在 Env.Observe 与提示词构造之间，用快速启发式给合法出牌打分，只把得分最高的 K 种写入提示词
+
+首出时合法出牌可能有数百种，全部写入提示词会显著增加提示词长度、首个token的延迟与费用。
+每种出牌的代价（越小越好）由以下几项加权得到：
+    拆牌代价  出这手后剩余手牌的最少出完手数比原来少一手以外多出的手数；排序时不逐个求解，
+              而是在 hand_solver 的拆法上估计（split_estimate），只对整手牌求解一次
+    控制代价  打出的控制牌（2、王）张数，炸弹/王炸另加代价（能一次出完时不计）
+    带牌代价  带牌（三带、四带二、飞机的翅膀）的点数，带小牌优先
+    点数      同等代价下先出点数小的，同点数优先张数多的
+提示词中用编号列出候选（编号即排名），LLM 回复编号后由 ActionMenu.resolve 映射回完整的出牌；
+不在菜单中但属于完整动作空间的出牌同样接受，保证映射回的出牌一定合法。
+"""
+from typing import Dict, List, Optional, Sequence, Union
+
+from Environment import hand_solver, move_table
+from Environment.card_validator import CardType, CardValidator, Counts, NUM_RANKS, RANK_INDEX
+from Environment.move_table import MOVE_LENGTH, MOVE_RANK, MOVE_TYPE, MOVES, PASS_ID, TYPE_ID
+
+# 写入提示词的候选出牌数（不含PASS）
+TOP_K = 12
+# 菜单中每种牌型最多的候选数，合法出牌的牌型不足时再按排名补满
+MAX_PER_TYPE = 3
+# 各项代价的权重
+SPLIT_WEIGHT = 10.0
+CONTROL_WEIGHT = 2.0
+BOMB_WEIGHT = 8.0
+KICKER_WEIGHT = 0.5
+# 2 及以上（2、小王、大王）为控制牌
+CONTROL_START = RANK_INDEX['2']
+BOMB_TYPES = (move_table.BOMB_TYPE, move_table.ROCKET_TYPE)
+# 带牌牌型 -> 主体中每个点数的张数
+KICKER_TYPES = {
+    TYPE_ID[CardType.TRIPLE_WITH_SINGLE]: 3,
+    TYPE_ID[CardType.TRIPLE_WITH_PAIR]: 3,
+    TYPE_ID[CardType.AIRPLANE_WITH_SINGLES]: 3,
+    TYPE_ID[CardType.AIRPLANE_WITH_PAIRS]: 3,
+    TYPE_ID[CardType.BOMB_WITH_SINGLES]: 4,
+    TYPE_ID[CardType.BOMB_WITH_PAIR]: 4,
+}
+
+
+def kicker_cost(move: int) -> float:
+    """带牌的点数之和（按槽位计），不带牌的牌型为 0"""
+    body = KICKER_TYPES.get(MOVE_TYPE[move])
+    if body is None:
+        return 0.0
+    return float(sum(rank * count for rank, count in enumerate(MOVES[move]) if 0 < count < body))
+
+
+def _play_cost(move: int) -> float:
+    """与手牌无关的代价：控制代价、带牌代价与点数"""
+    cards = MOVES[move]
+    bomb = BOMB_WEIGHT if MOVE_TYPE[move] in BOMB_TYPES else 0.0
+    return (CONTROL_WEIGHT * sum(cards[CONTROL_START:]) + bomb + KICKER_WEIGHT * kicker_cost(move)
+            + (MOVE_RANK[move] - 0.01 * MOVE_LENGTH[move]) / NUM_RANKS)
+
+
+def move_cost(hand: Counts, move: int, plays: Optional[int] = None) -> float:
+    """
+    出 move 的代价，越小越好；plays 为 hand 的最少出完手数，可传入已算好的值
+    能一次出完的出牌代价最小
+    """
+    if MOVE_LENGTH[move] == sum(hand):
+        return float('-inf')
+    if plays is None:
+        plays = hand_solver.min_plays(hand)
+    split = hand_solver.min_plays(move_table.play(hand, move)) + 1 - plays
+    return SPLIT_WEIGHT * split + _play_cost(move)
+
+
+def plan_holders(plan: Sequence[int]) -> Dict[int, List[int]]:
+    """点数槽位 -> 拆法 plan 中含有该点数的各手的下标，供 split_estimate 使用"""
+    holders: Dict[int, List[int]] = {}
+    for i, group in enumerate(plan):
+        for r in range(NUM_RANKS):
+            if MOVES[group][r]:
+                holders.setdefault(r, []).append(i)
+    return holders
+
+
+def split_estimate(plan: Sequence[int], holders: Dict[int, List[int]], move: int) -> int:
+    """
+    不对剩余手牌求解，估计出 move 的拆牌代价：plan 为 hand_solver 的一种最优拆法，holders 为点数槽位 -> 含该点数的手
+    把 move 的牌按点数依次分摊到拆法中的各手，被用到的手换成其剩余部分的最少手数（剩余部分很小，求解很快）。
+    这样得到剩余手牌的一种拆法，估计值不小于精确的拆牌代价；拆法中现成的出牌为 0
+    """
+    cards = MOVES[move]
+    taken: Dict[int, List[int]] = {}
+    for r in range(NUM_RANKS):
+        need = cards[r]
+        for i in holders.get(r, ()) if need else ():
+            used = min(need, MOVES[plan[i]][r] - taken.get(i, (0,) * NUM_RANKS)[r])
+            if used:
+                row = taken.setdefault(i, [0] * NUM_RANKS)
+                row[r] += used
+                need -= used
+                if not need:
+                    break
+    split = 1 - len(taken)
+    for i, row in taken.items():
+        if sum(row) < MOVE_LENGTH[plan[i]]:
+            split += hand_solver.min_plays(tuple(have - used for have, used in zip(MOVES[plan[i]], row)))
+    return max(split, 0)
+
+
+def rank_moves(hand: Counts, moves: Sequence[int], k: Optional[int] = TOP_K,
+               per_type: Optional[int] = MAX_PER_TYPE) -> List[int]:
+    """
+    按代价从小到大排列 moves 中的非PASS出牌，返回前 k 种（k 为 None 时返回全部）
+    per_type 限制每种牌型的候选数，使前 k 种覆盖更多牌型（为 None 时只按代价排序）
+    只对整手牌求解一次拆法，各出牌的拆牌代价用 split_estimate 估计
+    """
+    plan = hand_solver.decompose(hand)
+    holders = plan_holders(plan)
+    left = sum(hand)
+    scored = []
+    for move in moves:
+        if move == PASS_ID:
+            continue
+        if MOVE_LENGTH[move] == left:
+            cost = float('-inf')
+        else:
+            cost = SPLIT_WEIGHT * split_estimate(plan, holders, move) + _play_cost(move)
+        scored.append((cost, move))
+    scored.sort()
+    ranked = [move for _, move in scored]
+    if k is None or len(ranked) <= k:
+        return ranked
+    if per_type is None:
+        return ranked[:k]
+    chosen, rest, types = [], [], {}
+    for move in ranked:
+        t = MOVE_TYPE[move]
+        if types.get(t, 0) < per_type and len(chosen) < k:
+            types[t] = types.get(t, 0) + 1
+            chosen.append(move)
+        else:
+            rest.append(move)
+    # 按排名补满后恢复代价顺序
+    chosen = set(chosen + rest[:k - len(chosen)])
+    return [move for move in ranked if move in chosen]
+
+
+class ActionMenu:
+    """
+    写入提示词的候选出牌菜单：编号 -> 出牌ID，以及编号到完整出牌的合法映射
+
+    Args:
+        hand: 手牌（牌列表）
+        action_space: Env.Observe 给出的完整动作空间（牌列表的列表）
+        k: 菜单中的候选数（不含PASS），为 None 时列出全部
+    """
+
+    def __init__(self, hand: List[str], action_space: List[List[str]], k: Optional[int] = TOP_K):
+        self.action_space = action_space
+        ids = [move_table.move_id(cards) for cards in action_space]
+        self.legal = {move: cards for move, cards in zip(ids, action_space) if move is not None}
+        counts = CardValidator.to_counts(hand)
+        if counts is None:
+            moves = [move for move in self.legal if move != PASS_ID]
+            moves = moves if k is None else moves[:k]
+        else:
+            moves = rank_moves(counts, list(self.legal), k)
+        # PASS 合法时总是列在最后
+        if PASS_ID in self.legal:
+            moves.append(PASS_ID)
+        self.moves = moves
+
+    @property
+    def truncated(self) -> bool:
+        """菜单是否省略了部分合法出牌"""
+        return len(self.moves) < len(self.legal)
+
+    def text(self) -> str:
+        """提示词中的菜单文本，每行为 "编号: 牌 牌型" """
+        lines = [f"{i}: {' '.join(self.legal[move])} {move_table.move_type(move)}"
+                 for i, move in enumerate(self.moves)]
+        if self.truncated:
+            lines.append(f"（共{len(self.legal)}种合法出牌，按推荐程度列出前{len(self.moves)}种）")
+        return "\n".join(lines)
+
+    def resolve(self, choice: Union[int, List[str]]) -> List[str]:
+        """
+        把LLM的选择映射回动作空间中的出牌：choice 为菜单编号，或直接写出的牌
+        写出的牌与某个合法出牌相同（不计顺序）时返回该出牌；编号越界时抛出 ValueError
+        """
+        if isinstance(choice, int) and not isinstance(choice, bool):
+            if not 0 <= choice < len(self.moves):
+                raise ValueError(f"出牌编号 {choice} 不在 0~{len(self.moves) - 1} 之间")
+            return self.legal[self.moves[choice]]
+        move = move_table.move_id(choice) if isinstance(choice, list) else None
+        if move is not None and move in self.legal:
+            return self.legal[move]
+        return choice
+
+
+if __name__ == '__main__':
+    import time
+    from Environment.doudizhu import Env
+
+    env = Env(seed=7)
+    env.reset()
+    current_player, hand, action_space, history, state = env.Observe()
+    start = time.perf_counter()
+    menu = ActionMenu(hand, action_space)
+    elapsed = time.perf_counter() - start
+    print(f"{current_player} 手牌: {hand}")
+    print(f"合法出牌 {len(action_space)} 种，排序用时 {elapsed * 1000:.2f}ms")
+    print(menu.text())
+    print("编号 0 ->", menu.resolve(0))
+
+    # 估计的拆牌代价不小于逐个求解得到的精确值，拆法中现成的出牌为 0
+    counts = env.hand_counts[current_player]
+    plays = hand_solver.min_plays(counts)
+    plan = hand_solver.decompose(counts)
+    holders = plan_holders(plan)
+    for move in env.legal_moves():
+        exact = hand_solver.min_plays(move_table.play(counts, move)) + 1 - plays
+        assert split_estimate(plan, holders, move) >= exact, move_table.move_cards(move)
+    assert all(split_estimate(plan, holders, move) == 0 for move in plan)
@@ -1,14 +1,43 @@
-from .llm_client import AgentsLLM
-from .prompt import BASE_PROMPT, SYSTEMPROMPT,ERR_PROMPT
+from .llm_client import AgentsLLM, STRUCTURED_MODES
+from .prompt import BASE_PROMPT, SYSTEMPROMPT,ERR_PROMPT, STRUCTURED_PROMPT
+from Environment import hand_solver, move_table
+from Environment.card_validator import CardValidator
+from Environment.doudizhu import Env
+from Environment.endgame import EndgameSolver
+from .action_ranker import ActionMenu, TOP_K
+from .decision_cache import DecisionCache, cache_version, state_key
+from .fast_agents import fallback_decision
 import ast
+import threading
+from typing import Optional
 from utils import logger
-import random
 import time
 # 地主、农民甲、农民乙基础agent
 class BaseAgent:
-    def __init__(self, name: str, llm_client: AgentsLLM):
+    def __init__(self, name: str, llm_client: AgentsLLM, env: Env = None, endgame: EndgameSolver = None,
+                 top_k: int = TOP_K, cache: DecisionCache = None, output_mode: str = 'text'):
+        """
+        Args:
+            env: 所在的游戏环境；提供时进入残局后由 endgame 求解，必胜局面直接出牌不调用LLM
+            endgame: 残局求解器，默认使用 EndgameSolver()
+            top_k: 提示词中列出的候选出牌数（按 action_ranker 排序，不含PASS），为 None 时列出全部合法出牌
+            cache: 决策缓存，需同时提供 env；相同局面直接使用缓存的出牌，不调用LLM
+            output_mode: 默认 'text'，即 [THGOUGHT]/[ACTION] 文本格式；
+                'tool' / 'json_schema' 时模型以结构化输出只返回候选出牌的编号，不会出现无效出牌，
+                端点不支持时自动退回文本格式
+        """
         self.name = name
         self.llm_client = llm_client()
+        self.env = env
+        self.endgame = endgame if endgame is not None else EndgameSolver()
+        self.top_k = top_k
+        self.cache = cache
+        # 置位后取消进行中的流式LLM请求，由推测执行为代理副本设置
+        self.cancel: Optional[threading.Event] = None
+        # 模型或提示词变更后缓存的旧决策自动失效
+        self.output_mode = output_mode
+        self.cache_version = cache_version(getattr(self.llm_client, 'model', None), SYSTEMPROMPT, BASE_PROMPT, top_k,
+                                           output_mode, STRUCTURED_PROMPT if output_mode in STRUCTURED_MODES else "")
 
     def make_decision(self,
                       history: list[str],
@@ -23,10 +52,35 @@ class BaseAgent:
             time.sleep(6)
             return ['PASS']
         
+        if self.env is not None and self.env.current_player == self.name:
+            solved = self.endgame.solve(self.env)
+            if solved is not None and solved[1]:
+                logger.info(f"{self.name} 残局必胜，直接出牌")
+                return move_table.move_cards(solved[0])
+
+        cache_key = None
+        if self.cache is not None and self.env is not None and self.env.current_player == self.name and not err_msg:
+            cache_key = state_key(self.env)
+            cached = self.cache.get(self.cache_version, cache_key, self.env.legal_moves())
+            if cached is not None:
+                logger.info(f"{self.name} 命中决策缓存，直接出牌")
+                return move_table.move_cards(cached)
+
+        plan = self._hand_plan(hand)
+        if plan:
+            state = f"{state}\n{plan}"
+        # 合法出牌按启发式排序后只列出前 top_k 种，LLM 回复编号，解析时映射回完整出牌
+        menu = ActionMenu(hand, action_space, self.top_k) if action_space else None
+        choices = menu.text() if menu is not None else str(action_space)
+        if menu is not None and self.output_mode in STRUCTURED_MODES:
+            action = self._choose_structured(menu, history, state, hand)
+            if action is not None:
+                self._remember(cache_key, action)
+                return action
         if not err_msg:
-            prompt= BASE_PROMPT.format(role=self.name, history="\n".join(history), state=state, hand=hand,action_space=str(action_space))
+            prompt= BASE_PROMPT.format(role=self.name, history=self._history_text(history), state=state, hand=hand,action_space=choices)
         else:
-            prompt= ERR_PROMPT.format(role=self.name, history="\n".join(history), state=state, hand=hand, err_msg=err_msg,action_space=str(action_space))
+            prompt= ERR_PROMPT.format(role=self.name, history=self._history_text(history), state=state, hand=hand, err_msg=err_msg,action_space=choices)
         
         exampleMessages = [
             {"role": "system", "content": SYSTEMPROMPT},
@@ -35,22 +89,80 @@ class BaseAgent:
         
         # print("--- 调用LLM ---")
         try:
-            responseText = self.llm_client.think_streaming(exampleMessages)
+            # 流式解析，收到合法的出牌后立即结束生成
+            responseText = self.llm_client.think_until_action(exampleMessages, accept=self._legal_action(menu),
+                                                              cancel=self.cancel)
+            if responseText is None and self.cancel is not None and self.cancel.is_set():
+                # 推测分支已作废，结果不会被采用
+                return fallback_decision(self.name, hand, action_space, self.env)
             # logger.info(f"{self.name}\n: {responseText}")
-            action= self._parse_response(responseText)
+            action= self._parse_response(responseText, menu)
+            self._remember(cache_key, action)
             return action
         except Exception as e:
             logger.error(f"调用LLM时出错: {e}")
-            return  random.choice(action_space) # 出现错误时，随机从选择空间出一个牌型
-    def _parse_response(self, response: str) -> list[str]:
+            return fallback_decision(self.name, hand, action_space, self.env) # 出现错误时，由拆牌代理兜底出牌
+    def _choose_structured(self, menu: ActionMenu, history: list[str], state: str, hand: list[str]):
+        """结构化输出：模型只返回候选编号，映射回的出牌一定合法；端点不支持或出错时返回 None"""
+        prompt = STRUCTURED_PROMPT.format(role=self.name, history=self._history_text(history), state=state, hand=hand,
+                                          action_space=menu.text())
+        messages = [
+            {"role": "system", "content": SYSTEMPROMPT},
+            {"role": "user", "content": prompt}
+        ]
+        index = self.llm_client.choose_index(messages, len(menu.moves), self.output_mode)
+        if index is None:
+            return None
+        return menu.resolve(index)
+
+    def _remember(self, cache_key: str, action) -> None:
+        """LLM给出的出牌合法时写入决策缓存"""
+        if cache_key is None:
+            return
+        move = move_table.move_id(action) if isinstance(action, list) else None
+        if move is not None and move in self.env.legal_moves():
+            self.cache.put(self.cache_version, cache_key, move)
+
+    def _history_text(self, history: list[str]) -> str:
+        """出牌历史的提示词文本；传入的是所在环境的历史时直接取事件日志缓存的拼接结果"""
+        if self.env is not None and history is self.env.history:
+            return self.env.events.text()
+        return "\n".join(history)
+
+    @staticmethod
+    def _hand_plan(hand: list[str]) -> str:
+        """手牌的最少出完手数与对应拆法，写入提示词作为牌力参考；手牌无法识别时返回空字符串"""
+        if not isinstance(hand, list) or not hand or CardValidator.to_counts(hand) is None:
+            return ""
+        plan = hand_solver.decompose_cards(hand)
+        return f"你的手牌最少还需{len(plan)}手出完，一种拆法：{plan}"
+
+    @staticmethod
+    def _legal_action(menu: ActionMenu):
+        """流式解析时判断 [ACTION] 的取值能否映射为合法出牌；没有动作空间时只要完整即接受"""
+        if menu is None:
+            return None
+
+        def accept(action) -> bool:
+            try:
+                cards = menu.resolve(action)
+            except ValueError:
+                return False
+            return isinstance(cards, list) and move_table.move_id(cards) in menu.legal
+        return accept
+
+    def _parse_response(self, response: str, menu: ActionMenu = None) -> list[str]:
         """
         解析LLM的响应，提取出决策部分。
-        这个方法需要根据具体的响应格式进行实现。
+        [ACTION] 为候选出牌的编号时，通过 menu 映射回完整的出牌；也接受直接写出的牌
         """
         # 这里只是一个简单的示例，假设响应格式为 "[THOUGHT]: ... [ACTION]: <decision>"
-        action_part = response.split("[ACTION]:")[1].strip()
-        # 使用 ast.literal_eval 将字符串形式的列表转换为真正的列表
-        return ast.literal_eval(action_part)
+        action_part = response.split("[ACTION]:")[-1].strip()
+        # 使用 ast.literal_eval 将字符串形式的列表（或编号）转换为真正的列表
+        action = ast.literal_eval(action_part)
+        if menu is not None:
+            return menu.resolve(action)
+        return action
         
 
 
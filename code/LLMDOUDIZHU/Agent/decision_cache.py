@@ -0,0 +1,191 @@
+"""
+LLM决策缓存：相同局面不再重复调用LLM
+
+实际对局中很多局面会重复出现（只能跟一种牌或不得不PASS、常见的开局），
+以局面指纹（座位、自己的手牌、上一手出牌及其出牌者、各家剩余张数）为键缓存LLM给出的出牌ID：
+- 内存中的LRU在前，本地SQLite在后，进程重启后仍然有效
+- 每条记录带有版本（由模型ID与提示词模板的哈希得到），提示词或模型变更后旧记录自动失效；可设置过期时间
+- 命中的出牌在返回前与当前的合法出牌核对，不合法的记录视为未命中
+- stats() 给出命中率等统计
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Collection, Dict, Optional, Tuple
+
+from Environment.doudizhu import Env, PLAYERS
+
+# 内存LRU的容量（条）
+MEMORY_CAPACITY = 4096
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS decisions (
+    version TEXT NOT NULL,
+    key TEXT NOT NULL,
+    move INTEGER NOT NULL,
+    created REAL NOT NULL,
+    PRIMARY KEY (version, key)
+)
+"""
+
+
+def cache_version(model: str, *templates: object) -> str:
+    """由模型ID与提示词模板（及其他影响决策的配置）得到缓存版本"""
+    digest = hashlib.sha256(str(model).encode('utf-8'))
+    for template in templates:
+        digest.update(b'\0' + str(template).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def state_key(env: Env, player: Optional[str] = None) -> str:
+    """
+    player（默认为当前玩家）视角的局面指纹：座位、手牌计数、上一手出牌ID与出牌者座位、各座位剩余张数
+    """
+    player = player or env.current_player
+    hand = bytes(env.hand_counts[player]).hex()
+    left = ",".join(str(sum(env.hand_counts[p])) for p in PLAYERS)
+    return f"{PLAYERS.index(player)}|{hand}|{env.last_move}|{env.tracker.state.leader}|{left}"
+
+
+class DecisionCache:
+    """
+    两级决策缓存，可由多个代理、多个线程共享
+
+    Args:
+        path: SQLite 文件路径，为 None 时只使用内存
+        capacity: 内存LRU的容量
+        ttl: 记录的有效期（秒），为 None 时不过期
+    """
+
+    def __init__(self, path: Optional[str] = None, capacity: int = MEMORY_CAPACITY, ttl: Optional[float] = None):
+        self.path = path
+        self.capacity = capacity
+        self.ttl = ttl
+        self._memory: "OrderedDict[Tuple[str, str], Tuple[int, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path is not None:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(SCHEMA)
+            self._db.commit()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.writes = 0
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def get(self, version: str, key: str, legal: Collection[int]) -> Optional[int]:
+        """查询缓存的出牌ID；未命中、已过期或不在 legal 中时返回 None"""
+        with self._lock:
+            entry = self._memory.get((version, key))
+            source = 'memory'
+            if entry is None and self._db is not None:
+                row = self._db.execute("SELECT move, created FROM decisions WHERE version = ? AND key = ?",
+                                       (version, key)).fetchone()
+                if row is not None:
+                    entry = (row[0], row[1])
+                    source = 'disk'
+                    self._remember((version, key), entry)
+            if entry is None or self._expired(entry[1]):
+                self.misses += 1
+                return None
+            move = entry[0]
+            if move not in legal:
+                self.stale += 1
+                return None
+            self._memory.move_to_end((version, key))
+            if source == 'memory':
+                self.memory_hits += 1
+            else:
+                self.disk_hits += 1
+            return move
+
+    def put(self, version: str, key: str, move: int):
+        """写入一条决策（覆盖同一局面的旧记录）"""
+        entry = (move, time.time())
+        with self._lock:
+            self._remember((version, key), entry)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO decisions (version, key, move, created) VALUES (?, ?, ?, ?)",
+                                 (version, key, move, entry[1]))
+                self._db.commit()
+            self.writes += 1
+
+    def _remember(self, key: Tuple[str, str], entry: Tuple[int, float]):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.capacity:
+            self._memory.popitem(last=False)
+
+    def purge(self, keep_version: Optional[str] = None) -> int:
+        """删除已过期的记录；提供 keep_version 时同时删除其他版本的记录。返回删除的条数"""
+        with self._lock:
+            self._memory = OrderedDict((k, v) for k, v in self._memory.items()
+                                       if not self._expired(v[1]) and keep_version in (None, k[0]))
+            if self._db is None:
+                return 0
+            deleted = 0
+            if self.ttl is not None:
+                deleted += self._db.execute("DELETE FROM decisions WHERE created < ?",
+                                            (time.time() - self.ttl,)).rowcount
+            if keep_version is not None:
+                deleted += self._db.execute("DELETE FROM decisions WHERE version != ?", (keep_version,)).rowcount
+            self._db.commit()
+            return deleted
+
+    def stats(self) -> Dict[str, float]:
+        """命中统计：内存命中、磁盘命中、未命中、命中但已不合法的条数与总命中率"""
+        lookups = self.memory_hits + self.disk_hits + self.misses + self.stale
+        return {
+            'lookups': lookups,
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'stale': self.stale,
+            'writes': self.writes,
+            'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == '__main__':
+    import tempfile
+    from Agent.fast_agents import RuleAgent
+
+    # 用规则代理代替LLM：同一副牌打两遍，第二遍全部命中
+    path = os.path.join(tempfile.mkdtemp(), 'decisions.sqlite')
+    version = cache_version('rule', 'demo')
+    agents = {player: RuleAgent(player) for player in PLAYERS}
+    env = Env()
+    for run in range(2):
+        with DecisionCache(path) as cache:
+            env.reset(seed=1)
+            while not env.game_over():
+                key = state_key(env)
+                legal = env.legal_moves()
+                move = cache.get(version, key, legal)
+                if move is None:
+                    move = agents[env.current_player].act(env)
+                    cache.put(version, key, move)
+                env.step(env.current_player, move)
+            print(f"第{run + 1}遍: {cache.stats()}")
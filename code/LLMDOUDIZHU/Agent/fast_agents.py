@@ -0,0 +1,281 @@
+"""
+快速代理：不调用LLM、不做任何I/O，直接基于出牌ID做决策，用于无界面的批量自我对局
+所有快速代理都实现 act(env) -> 出牌ID
+"""
+import random
+from typing import List, Optional, Tuple
+
+from Environment import hand_solver, move_table
+from Environment.card_validator import CardType, CardValidator, Counts
+from Environment.doudizhu import Env, PLAYERS
+from Environment.move_table import MOVE_LENGTH, MOVE_RANK, MOVE_TYPE, PASS_ID
+from .action_ranker import plan_holders, split_estimate
+
+# 炸弹与王炸的牌型编号
+BOMB_TYPES = (move_table.BOMB_TYPE, move_table.ROCKET_TYPE)
+# 会拆掉炸弹的四带二
+FOUR_WITH_TWO_TYPES = (move_table.TYPE_ID[CardType.BOMB_WITH_SINGLES], move_table.TYPE_ID[CardType.BOMB_WITH_PAIR])
+
+
+def last_player(env: Env) -> Optional[str]:
+    """最后一次有效出牌的玩家，本轮尚无有效出牌时返回 None"""
+    if env.last_move == PASS_ID:
+        return None
+    index = PLAYERS.index(env.current_player)
+    return PLAYERS[(index - env.pass_count - 1) % len(PLAYERS)]
+
+
+def is_teammate(player: str, other: Optional[str]) -> bool:
+    """两名农民互为队友"""
+    return other is not None and player != other and player != "地主" and other != "地主"
+
+
+def finishing_move(env: Env, moves: List[int]) -> Optional[int]:
+    """能一次出完手牌的出牌"""
+    left = sum(env.hand_counts[env.current_player])
+    for move in moves:
+        if MOVE_LENGTH[move] == left:
+            return move
+    return None
+
+
+class RandomAgent:
+    """随机代理：在合法出牌中均匀随机选择"""
+
+    def __init__(self, name: str, seed: Optional[int] = None):
+        self.name = name
+        self.rng = random.Random(seed)
+
+    def act(self, env: Env) -> int:
+        return self.rng.choice(env.legal_moves())
+
+
+class GreedyAgent:
+    """
+    贪心代理：首出时出张数最多的牌（同张数出点数小的），
+    跟牌时出能压过上一手的最小非炸弹牌，压不过就PASS
+    """
+
+    def __init__(self, name: str, seed: Optional[int] = None):
+        self.name = name
+
+    def act(self, env: Env) -> int:
+        moves = env.legal_moves()
+        finish = finishing_move(env, moves)
+        if finish is not None:
+            return finish
+        plain = [m for m in moves if m != PASS_ID and MOVE_TYPE[m] not in BOMB_TYPES]
+        if env.last_move == PASS_ID:
+            if not plain:
+                return moves[0]
+            return max(plain, key=lambda m: (MOVE_LENGTH[m], -MOVE_RANK[m]))
+        # 跟牌的动作空间按ID升序排列，同牌型中第一个即点数最小的
+        return plain[0] if plain else PASS_ID
+
+
+class RuleAgent:
+    """
+    规则代理：
+    1. 能一次出完就出完
+    2. 不压队友的牌；对手剩牌不多时才动用炸弹
+    3. 首出时出点数最小的牌，同点数中优先出张数多的（顺子、连对、飞机）；
+       下家对手只剩一张时避免出单张，不得不出单张时出最大的
+    """
+
+    def __init__(self, name: str, seed: Optional[int] = None, bomb_threshold: int = 4):
+        self.name = name
+        self.bomb_threshold = bomb_threshold
+
+    def act(self, env: Env) -> int:
+        moves = env.legal_moves()
+        finish = finishing_move(env, moves)
+        if finish is not None:
+            return finish
+        player = env.current_player
+        if env.last_move == PASS_ID:
+            return self._lead(env, player, moves)
+
+        owner = last_player(env)
+        if is_teammate(player, owner):
+            return PASS_ID
+        plain = [m for m in moves if m != PASS_ID and MOVE_TYPE[m] not in BOMB_TYPES]
+        if plain:
+            return plain[0]
+        bombs = [m for m in moves if m != PASS_ID]
+        if bombs and sum(env.hand_counts[owner]) <= self.bomb_threshold:
+            return bombs[0]
+        return PASS_ID
+
+    def _lead(self, env: Env, player: str, moves: List[int]) -> int:
+        plain = [m for m in moves if MOVE_TYPE[m] not in BOMB_TYPES + FOUR_WITH_TWO_TYPES] or moves
+        next_player = PLAYERS[(PLAYERS.index(player) + 1) % len(PLAYERS)]
+        if not is_teammate(player, next_player) and sum(env.hand_counts[next_player]) == 1:
+            multi = [m for m in plain if MOVE_LENGTH[m] > 1]
+            if multi:
+                plain = multi
+            else:
+                return max(plain, key=lambda m: MOVE_RANK[m])
+        return min(plain, key=lambda m: (MOVE_RANK[m], -MOVE_LENGTH[m]))
+
+
+class PlanAgent:
+    """
+    拆牌代理：以手牌的最少出完手数（hand_solver）为核心的确定性启发式
+    每步最多求解一次拆法（上一步出的是拆法中的牌或PASS时直接沿用余下的拆法，不再求解），
+    跟牌时各出牌的拆牌代价用 action_ranker.split_estimate 在拆法上估计，不逐个求解；
+    1000 局自我对局中单步决策 p99 约 0.9ms，求解缓存未命中时对整手牌的那一次求解仍可能用几毫秒
+    1. 能一次出完就出完；只剩两手且其中一手是炸弹/王炸时先出炸弹
+    2. 首出时只出最优拆法中的牌：点数最小的优先，同点数优先张数多的；
+       下家对手只剩一张时避免出单张，下家队友只剩一张时出最小的单张送队友走
+    3. 跟牌时不压队友；优先出拆法中现成的牌，其次出不增加手数的最小的牌，
+       对手剩牌不多时不惜拆牌也要压；对手剩牌不超过 bomb_threshold 或炸完就能走时才用炸弹
+    除 act(env) 外也实现 BaseAgent.make_decision 的接口，可以单独作为一个座位，也用作LLM失败时的兜底
+
+    Args:
+        name: 玩家名称
+        seed: 不使用，与其他快速代理的构造参数保持一致
+        env: 所在的游戏环境，make_decision 时从中读取局面
+        bomb_threshold: 对手剩牌不超过该值时才动用炸弹
+        danger: 对手剩牌不超过该值时，跟牌不再顾及拆牌
+        max_candidates: 跟牌时最多评估的出牌数（按点数从小到大）
+    """
+    # 上一次决策后的 (手牌, 拆法)：出的是拆法中的一手或PASS时，余下的拆法仍是最优拆法
+
+    def __init__(self, name: str, seed: Optional[int] = None, env: Env = None, bomb_threshold: int = 4,
+                 danger: int = 2, max_candidates: int = 8):
+        self.name = name
+        self.env = env
+        self.bomb_threshold = bomb_threshold
+        self.danger = danger
+        self.max_candidates = max_candidates
+        self._plan: Optional[Tuple[Counts, List[int]]] = None
+
+    def make_decision(self,
+                      history: list[str],
+                      state: str, hand: list[str],
+                      err_msg: str = None,
+                      action_space: list[list[str]] = None) -> list[str]:
+        if self.env is not None and self.env.current_player == self.name:
+            return move_table.move_cards(self.act(self.env))
+        return self.decide_cards(hand, action_space)
+
+    def decide_cards(self, hand: list[str], action_space: list[list[str]]) -> list[str]:
+        """只有手牌与动作空间（牌列表）时的决策：不知道各家剩牌，只按拆牌选择"""
+        counts = CardValidator.to_counts(hand)
+        moves = [move_table.move_id(cards) for cards in action_space]
+        moves = [m for m in moves if m is not None]
+        if counts is None or not moves:
+            return action_space[0]
+        leading = PASS_ID not in moves
+        move = self.choose(counts, moves, leading)
+        return move_table.move_cards(move)
+
+    def act(self, env: Env) -> int:
+        player = env.current_player
+        moves = env.legal_moves()
+        hand = env.hand_counts[player]
+        index = PLAYERS.index(player)
+        next_player = PLAYERS[(index + 1) % len(PLAYERS)]
+        owner = last_player(env)
+        if owner is not None and is_teammate(player, owner):
+            # 队友的牌不压，除非能一次出完
+            return finishing_move(env, moves) or PASS_ID
+        opponents_left = min(sum(env.hand_counts[p]) for p in PLAYERS if p != player and not is_teammate(player, p))
+        return self.choose(hand, moves, env.last_move == PASS_ID,
+                           next_left=sum(env.hand_counts[next_player]),
+                           next_is_teammate=is_teammate(player, next_player),
+                           opponents_left=opponents_left,
+                           owner_left=sum(env.hand_counts[owner]) if owner is not None else None)
+
+    def choose(self, hand: Counts, moves: List[int], leading: bool, next_left: Optional[int] = None,
+               next_is_teammate: bool = False, opponents_left: Optional[int] = None,
+               owner_left: Optional[int] = None) -> int:
+        """
+        在合法出牌 moves 中选择一手
+        Args:
+            hand: 手牌计数向量
+            leading: 是否首出
+            next_left / next_is_teammate: 下家的剩牌数与是否为队友（未知时为 None）
+            opponents_left: 对手中最少的剩牌数（未知时为 None）
+            owner_left: 上一手出牌者的剩牌数（首出或未知时为 None）
+        """
+        left = sum(hand)
+        for move in moves:
+            if MOVE_LENGTH[move] == left:
+                return move
+        known = self._plan
+        plan = known[1] if known is not None and known[0] == hand else hand_solver.decompose(hand)
+        if leading:
+            move = self._lead(plan, moves, next_left, next_is_teammate)
+        else:
+            move = self._follow(hand, plan, moves, opponents_left, owner_left)
+        if move == PASS_ID:
+            self._plan = (hand, plan)
+        elif move in plan:
+            rest = list(plan)
+            rest.remove(move)
+            self._plan = (move_table.play(hand, move), rest)
+        else:
+            self._plan = None
+        return move
+
+    def _lead(self, plan: List[int], moves: List[int], next_left: Optional[int], next_is_teammate: bool) -> int:
+        legal = set(moves)
+        plan = [m for m in plan if m in legal] or moves
+        bombs = [m for m in plan if MOVE_TYPE[m] in BOMB_TYPES]
+        if len(plan) == 2 and bombs:
+            return bombs[-1]
+        plain = [m for m in plan if MOVE_TYPE[m] not in BOMB_TYPES] or plan
+        if next_left == 1:
+            singles = [m for m in moves if MOVE_LENGTH[m] == 1]
+            if next_is_teammate and singles:
+                return singles[0]
+            multi = [m for m in plain if MOVE_LENGTH[m] > 1]
+            if not next_is_teammate:
+                if multi:
+                    plain = multi
+                else:
+                    return max(plain, key=lambda m: MOVE_RANK[m])
+        return min(plain, key=lambda m: (MOVE_RANK[m], -MOVE_LENGTH[m]))
+
+    def _follow(self, hand: Counts, plan: List[int], moves: List[int], opponents_left: Optional[int],
+                owner_left: Optional[int]) -> int:
+        beaters = [m for m in moves if m != PASS_ID]
+        if not beaters:
+            return PASS_ID
+        plain = [m for m in beaters if MOVE_TYPE[m] not in BOMB_TYPES]
+        in_plan = [m for m in plain if m in plan]
+        if in_plan:
+            return in_plan[0]
+        holders = plan_holders(plan)
+        danger = opponents_left is not None and opponents_left <= self.danger
+        best, best_cost = None, None
+        for move in plain[:self.max_candidates]:
+            # 出这手之后剩余手牌的手数（估计值不小于精确值）为 len(plan) - 1 + split
+            cost = split_estimate(plan, holders, move)
+            if best is None or cost < best_cost:
+                best, best_cost = move, cost
+        # 出这手之后的手数不多于原来（拆牌不亏），或者对手快走完了
+        if best is not None and (best_cost == 0 or danger):
+            return best
+        bombs = [m for m in beaters if MOVE_TYPE[m] in BOMB_TYPES]
+        if bombs:
+            threatened = owner_left is not None and owner_left <= self.bomb_threshold
+            after = len(plan) - 1 + split_estimate(plan, holders, bombs[0])
+            if threatened or after <= 1:
+                return bombs[0]
+        return PASS_ID
+
+
+def fallback_decision(name: str, hand: list[str], action_space: list[list[str]], env: Env = None) -> list[str]:
+    """LLM 调用失败或输出不合法时的兜底出牌：用 PlanAgent 代替随机选择"""
+    return PlanAgent(name, env=env).make_decision([], "", hand, action_space=action_space)
+
+
+# 供模拟器按名称选择的快速代理
+FAST_AGENTS = {
+    'random': RandomAgent,
+    'greedy': GreedyAgent,
+    'rule': RuleAgent,
+    'plan': PlanAgent,
+}
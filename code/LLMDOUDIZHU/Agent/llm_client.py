@@ -1,11 +1,53 @@
+import ast
+import asyncio
+import json
 import os
-from openai import OpenAI
+import re
+import sys
+import threading
+import time
+import weakref
+from concurrent.futures import wait
+from openai import AsyncOpenAI, BadRequestError, OpenAI
 from dotenv import load_dotenv
-from typing import List, Dict
+from typing import Any, Callable, List, Dict, Optional, Tuple
 from utils import logger
 # 加载 .env 文件中的环境变量
 load_dotenv()
 
+ACTION_TAG = "[ACTION]:"
+# 结构化输出的方式：工具调用或 JSON schema
+STRUCTURED_MODES = ('tool', 'json_schema')
+_INDEX = re.compile(r'-?\d+')
+# think_until_action 检查取消标记的间隔（秒）
+CANCEL_POLL = 0.05
+
+
+def extract_action(text: str, final: bool = False) -> Optional[Tuple[Any, int]]:
+    """
+    从（可能尚未接收完的）响应文本中提取最后一个 [ACTION] 的取值（模型自我更正时以后写的为准）
+    取值为牌列表（到右方括号为止）或出牌编号（数字之后出现其他字符或 final 为真时才算完整）
+    返回 (取值, 取值在 text 中的结束位置)，尚不完整或无法解析时返回 None
+    """
+    start = text.rfind(ACTION_TAG)
+    if start < 0:
+        return None
+    start += len(ACTION_TAG)
+    rest = text[start:].lstrip()
+    offset = len(text) - len(rest)
+    if rest.startswith('['):
+        end = rest.find(']')
+        if end < 0:
+            return None
+        try:
+            return ast.literal_eval(rest[:end + 1]), offset + end + 1
+        except (ValueError, SyntaxError):
+            return None
+    match = _INDEX.match(rest)
+    if match is None or (match.end() == len(rest) and not final):
+        return None
+    return int(match.group()), offset + match.end()
+
 class AgentsLLM:
     """
     为本书 "Hello Agents" 定制的LLM客户端。
@@ -24,6 +66,14 @@ class AgentsLLM:
             raise ValueError("模型ID、API密钥和服务地址必须被提供或在.env文件中定义。")
 
         self.client = OpenAI(api_key=apiKey, base_url=baseUrl, timeout=timeout)
+        self._client_args = dict(api_key=apiKey, base_url=baseUrl, timeout=timeout)
+        # think_until_action 在独立的事件循环线程中运行 think_async，可以从任意线程（包括推测执行的线程池）调用；
+        # 异步客户端的连接池属于创建它的事件循环，每个事件循环首次调用 think_async 时各自创建
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._loop = None
+        self._loop_lock = threading.Lock()
+        # 端点不支持的结构化输出方式，之后不再尝试
+        self.unsupported = set()
 
     def think(self, messages: List[Dict[str, str]], temperature: float = 0, show_thinking: bool = True) -> str:
         """
@@ -117,6 +167,150 @@ class AgentsLLM:
             logger.error(f"❌ 调用LLM API时发生错误: {e}")
             return None
 
+    def _event_loop(self) -> asyncio.AbstractEventLoop:
+        """think_until_action 使用的后台事件循环，首次调用时启动"""
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name='llm-client', daemon=True).start()
+            return self._loop
 
+    def _async_client(self) -> AsyncOpenAI:
+        """当前事件循环的异步客户端，首次使用时创建"""
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = self._async_clients[loop] = AsyncOpenAI(**self._client_args)
+        return client
 
+    async def think_async(self, messages: List[Dict[str, str]], accept: Callable[[Any], bool] = None,
+                          temperature: float = 0, show_output: bool = False, show_thinking: bool = False) -> str:
+        """
+        异步流式调用，边接收边解析 [ACTION]，收到完整且 accept(取值) 为真的出牌后立即关闭流、取消剩余的生成
+        可以在任意事件循环中直接 await，也可以通过 think_until_action 同步调用
 
+        Args:
+            messages: 消息列表
+            accept: 判断提取到的出牌是否合法，为 None 时只要完整即接受
+            show_output / show_thinking: 是否打印输出与thinking内容；打印在结束时一次性写出
+        Returns:
+            提前结束时为截止到出牌的响应文本，否则为完整的响应文本
+        """
+        thinking: List[str] = []
+        text = ""
+        tagged = False  # 是否已经收到 [ACTION] 标记，之前的片段不需要解析
+        stream = await self._async_client().chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            stream=True,
+        )
+        try:
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                reasoning = getattr(delta, 'reasoning_content', None)
+                if reasoning:
+                    thinking.append(reasoning)
+                if not delta.content:
+                    continue
+                text += delta.content
+                tagged = tagged or ACTION_TAG in text[-len(delta.content) - len(ACTION_TAG):]
+                if tagged:
+                    found = extract_action(text)
+                    if found is not None and (accept is None or accept(found[0])):
+                        text = text[:found[1]]
+                        break
+        finally:
+            # 提前结束时关闭连接，服务端停止生成
+            await stream.close()
+        thinking_text = "".join(thinking)
+        if show_thinking and thinking_text:
+            sys.stdout.write(f"\033[90m{thinking_text}\033[0m\n")
+        if show_output:
+            sys.stdout.write(text + "\n")
+            sys.stdout.flush()
+        logger.info(thinking_text)
+        logger.info(text)
+        return text
+
+    def think_until_action(self, messages: List[Dict[str, str]], accept: Callable[[Any], bool] = None,
+                           temperature: float = 0, show_output: bool = False, show_thinking: bool = False,
+                           timeout: float = 60, cancel: threading.Event = None) -> str:
+        """
+        think_async 的同步封装：在后台事件循环中运行，超时后取消请求
+        cancel 被置位时（如推测执行的分支作废）同样取消请求、关闭流，返回 None
+        出错时与 think_streaming 一致，记录日志并返回 None
+        """
+        future = asyncio.run_coroutine_threadsafe(
+            self.think_async(messages, accept, temperature, show_output, show_thinking), self._event_loop())
+        try:
+            if cancel is not None:
+                end = time.monotonic() + timeout
+                while not future.done() and not cancel.is_set() and time.monotonic() < end:
+                    wait([future], CANCEL_POLL)
+                if not future.done() and cancel.is_set():
+                    future.cancel()
+                    logger.info("请求已取消")
+                    return None
+                timeout = max(0.0, end - time.monotonic())
+            return future.result(timeout)
+        except Exception as e:
+            future.cancel()
+            logger.error(f"❌ 调用LLM API时发生错误: {e}")
+            return None
+
+    def choose_index(self, messages: List[Dict[str, str]], count: int, mode: str = 'tool',
+                     temperature: float = 0) -> Optional[int]:
+        """
+        结构化输出：让模型从 0 ~ count-1 中选择一个编号
+        mode 为 'tool' 时强制调用 play 工具，为 'json_schema' 时要求按 JSON schema 输出 {"index": 编号}，
+        编号用 enum 限定在候选范围内。端点拒绝该方式的请求（BadRequestError）时记入 unsupported，
+        出错或无法解析时返回 None，由调用方退回文本格式
+        """
+        if mode not in STRUCTURED_MODES or mode in self.unsupported:
+            return None
+        schema = {
+            "type": "object",
+            "properties": {"index": {"type": "integer", "enum": list(range(count)), "description": "所选出牌的编号"}},
+            "required": ["index"],
+            "additionalProperties": False,
+        }
+        if mode == 'tool':
+            extra = {
+                "tools": [{"type": "function",
+                           "function": {"name": "play", "description": "按编号选择要出的牌", "parameters": schema}}],
+                "tool_choice": {"type": "function", "function": {"name": "play"}},
+            }
+        else:
+            extra = {"response_format": {"type": "json_schema",
+                                         "json_schema": {"name": "move", "strict": True, "schema": schema}}}
+        try:
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=temperature,
+                stream=False,
+                **extra,
+            )
+        except BadRequestError as e:
+            self.unsupported.add(mode)
+            logger.warning(f"端点不支持结构化输出 {mode}，改用文本格式: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"❌ 调用LLM API时发生错误: {e}")
+            return None
+        message = response.choices[0].message
+        try:
+            if mode == 'tool':
+                arguments = message.tool_calls[0].function.arguments
+            else:
+                arguments = message.content
+            index = json.loads(arguments)["index"]
+        except (TypeError, IndexError, KeyError, ValueError) as e:
+            # 端点接受了请求，只是这一次的输出不合格，下次仍然尝试结构化输出
+            logger.warning(f"无法解析结构化输出 {mode}，本次改用文本格式: {e}")
+            return None
+        logger.info(f"结构化输出: {index}")
+        return index if isinstance(index, int) and not isinstance(index, bool) and 0 <= index < count else None
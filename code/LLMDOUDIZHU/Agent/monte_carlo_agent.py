@@ -0,0 +1,188 @@
+"""
+确定化蒙特卡洛代理：不调用LLM，在本地搜索出牌
+
+每次决策时反复执行：
+1. 确定化：按公开信息（自己的手牌、各家已出的牌、各家剩余张数、地主尚未打出的底牌）
+   随机生成两名对手的手牌
+2. 对每个候选出牌，在确定化后的局面上先打出该牌，再由规则代理替三家把这局打完
+直到用完每步的时间预算，选择平均胜率最高的出牌。采样与模拟可以分给多个进程并行，核数越多模拟次数越多。
+"""
+import random
+import time
+from multiprocessing import Pool
+from typing import Dict, List, Optional, Tuple
+
+from Environment import move_table
+from Environment.card_validator import Counts, FULL_DECK, NUM_RANKS
+from Environment.doudizhu import Env, PLAYERS
+from Environment.move_table import MOVE_LENGTH, MOVE_RANK, MOVE_TYPE, PASS_ID
+from .fast_agents import RuleAgent, fallback_decision
+
+
+def public_observation(env: Env) -> Dict[str, object]:
+    """当前玩家能看到的信息：自己的手牌、各家已出的牌与剩余张数、底牌、出牌局面"""
+    player = env.current_player
+    return {
+        'player': player,
+        'hand': env.hand_counts[player],
+        'played': env.played_counts,
+        'cards_left': {p: sum(counts) for p, counts in env.hand_counts.items()},
+        'bottom': env.validator.to_counts(env.bottom_cards) or (0,) * NUM_RANKS,
+        'last_move': env.last_move,
+        'pass_count': env.pass_count,
+    }
+
+
+def sample_hands(observation: Dict[str, object], rng: random.Random) -> Dict[str, Counts]:
+    """按公开信息随机生成一种三家手牌：未出现的牌随机分给两名对手，地主尚未打出的底牌一定在地主手中"""
+    player, hand, played = observation['player'], observation['hand'], observation['played']
+    unseen = [FULL_DECK[r] - hand[r] - sum(counts[r] for counts in played.values()) for r in range(NUM_RANKS)]
+    hands = {player: hand}
+    opponents = [p for p in PLAYERS if p != player]
+    forced = {p: [0] * NUM_RANKS for p in opponents}
+    if player != "地主":
+        for r in range(NUM_RANKS):
+            known = max(0, observation['bottom'][r] - played["地主"][r])
+            forced["地主"][r] = known
+            unseen[r] -= known
+    pool = [r for r in range(NUM_RANKS) for _ in range(unseen[r])]
+    rng.shuffle(pool)
+    for p in opponents:
+        counts = forced[p]
+        need = observation['cards_left'][p] - sum(counts)
+        for r in pool[:need]:
+            counts[r] += 1
+        pool = pool[need:]
+        hands[p] = tuple(counts)
+    return hands
+
+
+def candidate_moves(env: Env, max_kickers: int) -> List[int]:
+    """候选出牌：合法出牌中每个主体最多保留 max_kickers 种带牌方案（带牌点数小的优先）"""
+    kept, seen = [], {}
+    for move in env.legal_moves():
+        key = (MOVE_TYPE[move], MOVE_LENGTH[move], MOVE_RANK[move])
+        seen[key] = seen.get(key, 0) + 1
+        if seen[key] <= max_kickers:
+            kept.append(move)
+    return kept
+
+
+def run_rollouts(task: Tuple[Dict[str, object], List[int], float, int]) -> Tuple[List[int], List[int], int]:
+    """
+    工作进程：在 budget 秒内反复采样确定化局面，每个局面上把每个候选出牌各模拟一局
+    返回 (各候选出牌本方获胜次数, 各候选出牌模拟次数, 模拟总局数)
+    """
+    observation, candidates, budget, seed = task
+    deadline = time.perf_counter() + budget
+    rng = random.Random(seed)
+    policy = {p: RuleAgent(p) for p in PLAYERS}
+    player = observation['player']
+    wins, visits = [0] * len(candidates), [0] * len(candidates)
+    rollouts = 0
+    while time.perf_counter() < deadline:
+        base = Env.from_state(sample_hands(observation, rng), player,
+                              observation['last_move'], observation['pass_count'])
+        for i, move in enumerate(candidates):
+            env = base.clone()
+            mover = player
+            env.step(mover, move)
+            while not env.game_over():
+                mover = env.current_player
+                env.step(mover, policy[mover].act(env))
+            wins[i] += (mover == "地主") == (player == "地主")
+            visits[i] += 1
+            rollouts += 1
+    return wins, visits, rollouts
+
+
+class MonteCarloAgent:
+    """
+    确定化蒙特卡洛代理，接口同 BaseAgent.make_decision，也实现快速代理的 act(env)
+    workers 大于1时首次搜索会创建进程池，用完后调用 close() 或用 with 语句关闭
+
+    Args:
+        name: 玩家名称
+        env: 所在的游戏环境（make_decision 从中读取公开信息；为 None 时 make_decision 只按手牌与动作空间决策）
+        time_budget: 每步的搜索时间（秒）
+        workers: 并行模拟的进程数，为1时在当前进程中运行
+        max_kickers: 每个主体最多考虑的带牌方案数
+        seed: 随机数种子
+    """
+
+    def __init__(self, name: str, env: Env = None, time_budget: float = 1.0, workers: int = 1,
+                 max_kickers: int = 2, seed: Optional[int] = None):
+        self.name = name
+        self.env = env
+        self.time_budget = time_budget
+        self.workers = workers
+        self.max_kickers = max_kickers
+        self.rng = random.Random(seed)
+        self._pool = None
+        # 最近一次搜索的统计：模拟局数、用时、每秒模拟局数
+        self.last_stats: Dict[str, float] = {}
+
+    def make_decision(self,
+                      history: list[str],
+                      state: str, hand: list[str],
+                      err_msg: str = None,
+                      action_space: list[list[str]] = None) -> list[str]:
+        if self.env is not None and self.env.current_player == self.name:
+            return move_table.move_cards(self.act(self.env))
+        # 没有环境时无法确定化搜索，按拆牌规则决策
+        return fallback_decision(self.name, hand, action_space)
+
+    def act(self, env: Env) -> int:
+        candidates = candidate_moves(env, self.max_kickers)
+        left = sum(env.hand_counts[env.current_player])
+        for move in candidates:
+            if MOVE_LENGTH[move] == left:
+                return move
+        if len(candidates) == 1:
+            return candidates[0]
+
+        observation = public_observation(env)
+        start = time.perf_counter()
+        if self.workers > 1:
+            if self._pool is None:
+                self._pool = Pool(self.workers)
+            tasks = [(observation, candidates, self.time_budget, self.rng.getrandbits(32)) for _ in range(self.workers)]
+            results = self._pool.map(run_rollouts, tasks)
+        else:
+            results = [run_rollouts((observation, candidates, self.time_budget, self.rng.getrandbits(32)))]
+        elapsed = time.perf_counter() - start
+
+        wins = [sum(result[0][i] for result in results) for i in range(len(candidates))]
+        visits = [sum(result[1][i] for result in results) for i in range(len(candidates))]
+        rollouts = sum(result[2] for result in results)
+        self.last_stats = {'rollouts': rollouts, 'seconds': elapsed, 'rollouts_per_sec': rollouts / elapsed}
+        best = max(range(len(candidates)), key=lambda i: wins[i] / visits[i] if visits[i] else 0.0)
+        return candidates[best]
+
+    def close(self):
+        """关闭进程池"""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == '__main__':
+    random.seed(0)
+    env = Env()
+    env.reset()
+    for workers in (1, 4):
+        with MonteCarloAgent(env.current_player, env, time_budget=1.0, workers=workers, seed=0) as agent:
+            current_player, hand, action_space, history, state = env.Observe()
+            cards = agent.make_decision(history, state, hand, action_space=action_space)
+            stats = agent.last_stats
+        print(f"{workers} 进程: {env.current_player} 出 {cards}, "
+              f"模拟 {stats['rollouts']} 局, {stats['rollouts_per_sec']:.0f} 局/秒")
+    # 没有环境时按手牌与动作空间决策
+    print("无环境:", MonteCarloAgent(env.current_player).make_decision(history, state, hand, action_space=action_space))
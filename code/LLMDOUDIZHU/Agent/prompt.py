@@ -7,11 +7,11 @@ BASE_PROMPT="""
 {history}
 你的当前手牌：
 {hand}
-当前可以出的牌型：
+当前可以出的牌型（编号: 牌 牌型）：
 {action_space}
 请根据以上信息，输出你的决定。你的回复应遵循如下格式：
 [THGOUGHT]: <你的思考过程>
-[ACTION]: <你的出牌决定，格式为['3','4']或['PASS']>
+[ACTION]: <你选择的出牌编号，例如 0；也可以直接写出牌，格式为['3','4']或['PASS']>
 请严格遵循如上格式进行回复。
 """
 ERR_PROMPT="""
@@ -25,11 +25,27 @@ ERR_PROMPT="""
 {hand}
 注意：你上次的出牌尝试失败，原因是：
 {err_msg}
+当前可以出的牌型（编号: 牌 牌型）：
+{action_space}
 请根据以上信息，输出你的决定。你的回复应遵循如下格式：
 [THGOUGHT]: <你的思考过程>
-[ACTION]: <你的出牌决定，格式为['3','4']或['PASS']>
+[ACTION]: <你选择的出牌编号，例如 0；也可以直接写出牌，格式为['3','4']或['PASS']>
 请严格遵循如上格式进行回复。
 """
+# 结构化输出模式：候选出牌带编号，模型通过工具调用或JSON只返回所选编号，不需要输出思考过程
+STRUCTURED_PROMPT="""
+你是一个斗地主游戏高手，参与者有地主、农民甲、农民乙,你的身份是{role}.
+你通过出牌历史、当前游戏状态和当前手牌来决定出什么牌或者不要：
+当前游戏状态：
+{state}
+出牌历史：
+{history}
+你的当前手牌：
+{hand}
+当前可以出的牌型（编号: 牌 牌型）：
+{action_space}
+请从以上候选中选择一种出牌，只返回所选出牌的编号。
+"""
 role="农民乙"
 history="""
 地主： [3 4 5 6 7 8]
@@ -74,7 +90,7 @@ SYSTEMPROMPT="""
 【策略要点】
 1. 地主：控牌为主，用大牌压制，保留炸弹反制
 2. 农民：配合队友，适时让牌，集中火力攻击地主
-3. 记牌算牌：根据出牌历史判断对手剩余牌型，选择最优出牌
+3. 记牌算牌：状态中附有记牌信息（未出现的牌、各家可能的炸弹与推测），据此判断对手剩余牌型，选择最优出牌
 4. 拆牌技巧：必要时拆分大牌型（如拆炸弹、拆顺子）应对危局
 5. 终局意识：剩余牌少时，优先出能走完的牌型组合
 
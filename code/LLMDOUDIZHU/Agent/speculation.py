@@ -0,0 +1,189 @@
+"""
+推测执行：在当前玩家思考时，提前为下一个AI玩家计算决策
+
+一名人类和两名AI对局时，每个AI必须等上一家出完牌才开始调用LLM，人类要等待多次串行的LLM往返。
+推测执行在当前玩家思考期间，对其最可能的几种出牌（能PASS时为PASS，再加上 action_ranker 排名靠前的出牌）
+分别复制一份 Env 推进一步，在线程池中提前让下一个AI玩家在复制的局面上做决策。
+线程池小于分支数，排名靠后的分支排队等待。当前玩家实际出牌后，与之相同的推测分支的结果直接被采用，其余分支作废：
+尚未开始的分支被取消；已经开始的分支置位其代理副本的 cancel 标记，进行中的流式LLM请求随之取消。
+代理副本与原代理共享残局求解器（solve 加锁）与LLM客户端（可以多线程调用），结构化输出的请求无法中途取消。
+"""
+import copy
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Event, Lock
+from typing import Dict, List, Optional, Tuple
+
+from Environment.doudizhu import Env, PLAYERS
+from Environment.move_table import PASS_ID
+from utils import logger
+from .action_ranker import rank_moves
+
+# 每个局面推测的出牌数
+BRANCHES = 3
+# 同时进行的推测决策数，小于 BRANCHES 时排名最后的分支要等前面的分支结束才开始，作废时可以直接取消
+WORKERS = 2
+
+# (环境, 推测的出牌之前的事件数, 推测的出牌ID)
+SpeculationKey = Tuple[int, int, int]
+
+
+def predict_moves(env: Env, n: int = BRANCHES) -> List[int]:
+    """当前玩家最可能的 n 种出牌：跟牌时先是PASS，其余按 action_ranker 的排名"""
+    moves = env.legal_moves()
+    predicted = [PASS_ID] if PASS_ID in moves else []
+    hand = env.hand_counts[env.current_player]
+    predicted.extend(rank_moves(hand, moves, n - len(predicted)))
+    return predicted[:n]
+
+
+def _decide(agent, env: Env, cancel: Event) -> List[str]:
+    """在复制的局面上让 agent 的副本做决策，不影响原 agent 所在的环境；cancel 置位时副本的LLM请求被取消"""
+    shadow = copy.copy(agent)
+    shadow.env = env
+    shadow.cancel = cancel
+    current_player, hand, action_space, history, state = env.Observe()
+    return shadow.make_decision(history, state, hand, err_msg=None, action_space=action_space)
+
+
+class SpeculativeExecutor:
+    """
+    推测执行器，由Flask后端在每次局面推进后调用 speculate，在AI出牌前调用 take
+
+    Args:
+        branches: 每个局面推测的出牌数
+        workers: 线程池大小，即同时进行的推测决策数
+    """
+
+    def __init__(self, branches: int = BRANCHES, workers: int = WORKERS):
+        self.branches = branches
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='speculate')
+        self._pending: Dict[SpeculationKey, Tuple[Future, Event]] = {}
+        self._lock = Lock()
+        self.launched = 0
+        self.hits = 0
+        self.misses = 0
+        self.cancelled = 0
+        self.interrupted = 0
+        self.wasted = 0
+
+    def speculate(self, env: Env, agent) -> int:
+        """
+        当前玩家思考期间，为下一名玩家 agent 推测决策；返回新启动的分支数
+        应在局面推进之后、当前玩家开始决策之前调用，此时 env 不会被并发修改
+        """
+        if env.game_over():
+            return 0
+        base = len(env.events)
+        player = env.current_player
+        launched = 0
+        with self._lock:
+            # 更早局面上的推测已经不可能被采用
+            self._discard(lambda key: key[0] != id(env) or key[1] < base - 1)
+            for move in predict_moves(env, self.branches):
+                key = (id(env), base, move)
+                if key in self._pending:
+                    continue
+                branch = env.clone()
+                ok, _ = branch.step(player, move)
+                if not ok or branch.game_over() or branch.current_player != agent.name:
+                    continue
+                cancel = Event()
+                self._pending[key] = (self._pool.submit(_decide, agent, branch, cancel), cancel)
+                launched += 1
+            self.launched += launched
+        return launched
+
+    def take(self, env: Env) -> Optional[Future]:
+        """
+        当前AI玩家出牌前调用：上一手实际出牌与某个推测分支相同时返回该分支的 Future，否则返回 None
+        同一局面上的其他分支作废
+        """
+        base = len(env.events) - 1
+        if base < 0:
+            return None
+        key = (id(env), base, env.events.moves[base])
+        with self._lock:
+            branch = self._pending.pop(key, None)
+            self._discard(lambda k: k[0] != id(env) or k[1] <= base)
+            if branch is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return branch[0]
+
+    def cancel_all(self):
+        """开始新的一局时调用，作废全部推测"""
+        with self._lock:
+            self._discard(lambda key: True)
+
+    def _discard(self, obsolete):
+        for key in [key for key in self._pending if obsolete(key)]:
+            future, cancel = self._pending.pop(key)
+            if future.cancel():
+                self.cancelled += 1
+            elif not future.done():
+                cancel.set()
+                self.interrupted += 1
+            else:
+                self.wasted += 1
+
+    def stats(self) -> Dict[str, float]:
+        """推测统计：启动、采用、未命中、取消（未开始）、中断（进行中）与丢弃（已完成）的分支数"""
+        takes = self.hits + self.misses
+        return {
+            'launched': self.launched,
+            'hits': self.hits,
+            'misses': self.misses,
+            'cancelled': self.cancelled,
+            'interrupted': self.interrupted,
+            'wasted': self.wasted,
+            'hit_rate': self.hits / takes if takes else 0.0,
+        }
+
+    def shutdown(self):
+        self.cancel_all()
+        self._pool.shutdown(wait=False)
+        logger.info(f"推测执行统计: {self.stats()}")
+
+
+if __name__ == '__main__':
+    import time
+    from Agent.fast_agents import PlanAgent, RuleAgent
+
+    class SlowAgent(PlanAgent):
+        """模拟一次 0.2 秒、可以取消的LLM调用"""
+        cancel = None
+
+        def make_decision(self, *args, **kwargs):
+            if (self.cancel or Event()).wait(0.2):
+                return ['PASS']
+            return super().make_decision(*args, **kwargs)
+
+    # 地主为"人类"（规则代理，思考 0.2 秒），两名农民为慢速代理
+    for speculative in (False, True):
+        env = Env(seed=11)
+        env.reset()
+        human = RuleAgent("地主")
+        agents = {player: SlowAgent(player, env=env) for player in PLAYERS[1:]}
+        executor = SpeculativeExecutor()
+        waits = []
+        while not env.game_over():
+            player = env.current_player
+            next_player = PLAYERS[(PLAYERS.index(player) + 1) % len(PLAYERS)]
+            if speculative and next_player in agents:
+                executor.speculate(env, agents[next_player])
+            if player in agents:
+                start = time.perf_counter()
+                future = executor.take(env) if speculative else None
+                if future is not None:
+                    decision = future.result()
+                else:
+                    current_player, hand, action_space, history, state = env.Observe()
+                    decision = agents[player].make_decision(history, state, hand, action_space=action_space)
+                waits.append(time.perf_counter() - start)
+                env.step(player, decision)
+            else:
+                time.sleep(0.2)
+                env.step(player, human.act(env))
+        executor.shutdown()
+        print(f"推测执行={speculative}: AI回合平均等待 {sum(waits) / len(waits) * 1000:.0f}ms, {executor.stats()}")
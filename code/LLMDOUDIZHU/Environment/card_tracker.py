@@ -0,0 +1,205 @@
+"""
+记牌器：随出牌增量维护的公开信息
+
+每次出牌只更新与这手牌有关的几项（各家已出的牌、尚未打出的牌、推测上限），与对局长度无关。
+在此之上按观察者计算：
+- 未出现的牌：全副牌减去已打出的牌，再减去观察者自己的手牌
+- 每名其他玩家的约束：剩余张数、地主手中确定还有的底牌（底牌是公开的）、
+  因在对手出牌时PASS而推测没有更大的单张/对子（之后打出更大的单张/对子时撤销推测）
+- 每名其他玩家是否可能有炸弹（各点数）或王炸
+状态为不可变元组，Env 的快照直接保存 TrackerState，撤销与复制都不需要拷贝。
+"""
+from operator import add, sub
+from typing import Dict, List, NamedTuple, Tuple
+
+from .card_validator import CardType, CardValidator, Counts, EMPTY_COUNTS, NUM_RANKS, RANKS
+from .move_table import MOVE_RANK, MOVE_TYPE, MOVES, PASS_ID, TYPE_ID
+
+NUM_SEATS = 3
+LANDLORD = 0
+SINGLE_TYPE = TYPE_ID[CardType.SINGLE]
+PAIR_TYPE = TYPE_ID[CardType.PAIR]
+# 推测上限为 NO_CEILING 表示没有推测
+NO_CEILING = NUM_RANKS
+# MOVE_RANK 为点数值（槽位下标 + 3），推测上限按槽位记录
+RANK_BASE = 3
+SMALL_JOKER, BIG_JOKER = NUM_RANKS - 2, NUM_RANKS - 1
+
+
+class TrackerState(NamedTuple):
+    played: Tuple[Counts, Counts, Counts]  # 各座位已打出的牌
+    remaining: Counts  # 尚未打出的牌（三家手牌之和）
+    bottom: Counts  # 底牌
+    leader: int  # 本轮最后一手有效出牌的座位，-1 表示本轮尚无有效出牌
+    single_ceiling: Tuple[int, int, int]  # 推测各座位没有大于该槽位的单张
+    pair_ceiling: Tuple[int, int, int]  # 推测各座位没有大于该槽位的对子
+
+
+def _same_side(a: int, b: int) -> bool:
+    return (a == LANDLORD) == (b == LANDLORD)
+
+
+class CardTracker:
+    """
+    记牌器，由 Env 在发牌和每次出牌时更新
+
+    Args:
+        players: 座位编号对应的玩家名称
+    """
+
+    def __init__(self, players: List[str]):
+        self.players = players
+        self.state = TrackerState((EMPTY_COUNTS,) * NUM_SEATS, EMPTY_COUNTS, EMPTY_COUNTS, -1,
+                                  (NO_CEILING,) * NUM_SEATS, (NO_CEILING,) * NUM_SEATS)
+
+    def reset(self, hands: Tuple[Counts, ...], bottom: Counts):
+        """发牌后调用：hands 为按座位顺序的手牌（地主含底牌）"""
+        remaining = tuple(sum(column) for column in zip(*hands))
+        self.state = TrackerState((EMPTY_COUNTS,) * NUM_SEATS, remaining, bottom, -1,
+                                  (NO_CEILING,) * NUM_SEATS, (NO_CEILING,) * NUM_SEATS)
+
+    def update(self, seat: int, move: int, previous: int):
+        """seat 出 move 之后调用，previous 为出牌前的上一手出牌ID"""
+        s = self.state
+        single, pair = s.single_ceiling, s.pair_ceiling
+        if move == PASS_ID:
+            # 对手出的单张/对子不跟，推测没有更大的；队友出牌时不跟是让牌，不作推测
+            if s.leader >= 0 and not _same_side(seat, s.leader):
+                slot = MOVE_RANK[previous] - RANK_BASE
+                # 大王之上没有单张，不跟大王不提供信息
+                if MOVE_TYPE[previous] == SINGLE_TYPE and slot < single[seat] and slot != BIG_JOKER:
+                    single = single[:seat] + (slot,) + single[seat + 1:]
+                elif MOVE_TYPE[previous] == PAIR_TYPE and slot < pair[seat]:
+                    pair = pair[:seat] + (slot,) + pair[seat + 1:]
+            # 两家都不跟时开始新的一轮（与 Env 的连续PASS计数一致）
+            leader = -1 if (seat + 1) % NUM_SEATS == s.leader else s.leader
+            self.state = TrackerState(s.played, s.remaining, s.bottom, leader, single, pair)
+            return
+        cards = MOVES[move]
+        # 打出了比推测上限更大的单张/对子，说明之前是有牌不跟，撤销推测
+        slot = MOVE_RANK[move] - RANK_BASE
+        if MOVE_TYPE[move] == SINGLE_TYPE and slot > single[seat]:
+            single = single[:seat] + (NO_CEILING,) + single[seat + 1:]
+        elif MOVE_TYPE[move] == PAIR_TYPE and slot > pair[seat]:
+            pair = pair[:seat] + (NO_CEILING,) + pair[seat + 1:]
+        played = s.played[:seat] + (tuple(map(add, s.played[seat], cards)),) + s.played[seat + 1:]
+        self.state = TrackerState(played, tuple(map(sub, s.remaining, cards)), s.bottom, seat, single, pair)
+
+    def copy(self) -> "CardTracker":
+        tracker = CardTracker(self.players)
+        tracker.state = self.state
+        return tracker
+
+    # ---------------- 按观察者计算 ----------------
+
+    def unseen(self, hand: Counts) -> Counts:
+        """观察者看不到的牌：尚未打出且不在自己手中"""
+        return tuple(map(sub, self.state.remaining, hand))
+
+    def bottom_left(self) -> Counts:
+        """地主手中确定还有的底牌（底牌中尚未被地主打出的部分）"""
+        s = self.state
+        if not any(s.bottom):
+            return s.bottom
+        return tuple(b - p if b > p else 0 for b, p in zip(s.bottom, s.played[LANDLORD]))
+
+    def max_holding(self, viewer: int, hand: Counts, seat: int, cards_left: int,
+                    unseen: Counts = None) -> Counts:
+        """seat 手中各点数最多可能有几张；unseen 可传入已算好的 self.unseen(hand)"""
+        if unseen is None:
+            unseen = self.unseen(hand)
+        if viewer != LANDLORD and seat != LANDLORD:
+            # 地主手中确定有的底牌不可能在另一名农民手中
+            unseen = tuple(map(sub, unseen, self.bottom_left()))
+        if cards_left >= 4:
+            return unseen
+        return tuple(u if u < cards_left else cards_left for u in unseen)
+
+    @staticmethod
+    def bomb_ranks(holding: Counts) -> List[int]:
+        """按 max_holding 的结果，可能持有炸弹的点数槽位"""
+        return [r for r in range(SMALL_JOKER) if holding[r] == 4]
+
+    @staticmethod
+    def rocket_possible(holding: Counts, cards_left: int) -> bool:
+        """按 max_holding 的结果，是否可能持有王炸"""
+        return cards_left >= 2 and holding[SMALL_JOKER] == 1 and holding[BIG_JOKER] == 1
+
+    def view(self, viewer: int, hand: Counts, cards_left: Tuple[int, ...]) -> Dict[str, object]:
+        """
+        观察者视角的记牌信息（结构化），cards_left 为按座位顺序的剩余张数
+        no_single_above / no_pair_above 为推测没有更大单张/对子的点数槽位，没有推测时为 None
+        """
+        s = self.state
+        unseen = self.unseen(hand)
+        others = {}
+        for seat in range(NUM_SEATS):
+            if seat == viewer:
+                continue
+            holding = self.max_holding(viewer, hand, seat, cards_left[seat], unseen)
+            others[self.players[seat]] = {
+                'cards_left': cards_left[seat],
+                'teammate': _same_side(seat, viewer),
+                'played': s.played[seat],
+                'max_holding': holding,
+                'bomb_ranks': self.bomb_ranks(holding),
+                'rocket_possible': self.rocket_possible(holding, cards_left[seat]),
+                'no_single_above': None if s.single_ceiling[seat] == NO_CEILING else s.single_ceiling[seat],
+                'no_pair_above': None if s.pair_ceiling[seat] == NO_CEILING else s.pair_ceiling[seat],
+            }
+        return {
+            'unseen': unseen,
+            'landlord_bottom_left': self.bottom_left(),
+            'others': others,
+        }
+
+    def prompt(self, viewer: int, hand: Counts, cards_left: Tuple[int, ...]) -> str:
+        """观察者视角的记牌信息（提示词文本）"""
+        view = self.view(viewer, hand, cards_left)
+        unseen = " ".join(f"{RANKS[r]}×{n}" for r, n in enumerate(view['unseen']) if n)
+        lines = [f"记牌（其他玩家手中的牌，共{sum(view['unseen'])}张）：{unseen or '无'}"]
+        if viewer != LANDLORD and any(view['landlord_bottom_left']):
+            lines.append(f"地主手中确定还有底牌：{CardValidator.to_cards(view['landlord_bottom_left'])}")
+        for player, info in view['others'].items():
+            role = "队友" if info['teammate'] else "对手"
+            parts = [f"剩{info['cards_left']}张"]
+            bombs = [RANKS[r] for r in info['bomb_ranks']]
+            parts.append(f"可能的炸弹：{bombs if bombs else '无'}")
+            if info['rocket_possible']:
+                parts.append("可能有王炸")
+            if info['no_single_above'] is not None:
+                parts.append(f"推测没有大于{RANKS[info['no_single_above']]}的单张")
+            if info['no_pair_above'] is not None:
+                parts.append(f"推测没有大于{RANKS[info['no_pair_above']]}的对子")
+            lines.append(f"{player}（{role}）：" + "，".join(parts))
+        return "\n".join(lines)
+
+
+if __name__ == '__main__':
+    import random
+    from .doudizhu import Env
+
+    random.seed(3)
+    env = Env()
+    env.reset()
+    for _ in range(24):
+        env.step(env.current_player, random.choice(env.legal_moves()))
+    print(f"{env.current_player} 的手牌：{env.hands[env.current_player]}")
+    print(env.Observe()[4])
+
+    # 推测上限按槽位记录：农民甲不跟单张4、单张2和对2
+    from . import move_table
+    from .doudizhu import PLAYERS
+    hands = {"地主": CardValidator.to_counts(['4', '2', '2', '2', '5', '6']),
+             "农民甲": CardValidator.to_counts(['3', '3', '7']),
+             "农民乙": CardValidator.to_counts(['8', '9', '10'])}
+    expected = [(['4'], 'no_single_above', '4', "推测没有大于4的单张"),
+                (['2'], 'no_single_above', '2', "推测没有大于2的单张"),
+                (['2', '2'], 'no_pair_above', '2', "推测没有大于2的对子")]
+    for cards, key, rank, text in expected:
+        env = Env.from_state(hands)
+        env.step("地主", move_table.move_id(cards))
+        env.step("农民甲", PASS_ID)
+        info = env.tracker.view(0, hands["地主"], (6 - len(cards), 3, 3))['others']["农民甲"]
+        assert RANKS[info[key]] == rank, (cards, info[key])
+        assert text in env.tracker.prompt(0, hands["地主"], (6 - len(cards), 3, 3)), cards
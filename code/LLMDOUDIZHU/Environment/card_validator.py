@@ -1,5 +1,7 @@
-from typing import List, Tuple, Optional
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple, Optional, Union
 from collections import Counter
+from itertools import combinations, combinations_with_replacement, islice
+import random
 
 
 example=['3', '3', '3', '4', '4', '4']
@@ -24,307 +26,429 @@ class CardType:
     ROCKET = "王炸"
     PASS = "不要"
 
+# 手牌/出牌的计数向量表示：15个槽位，下标 = 点数值 - 3
+# 即 3,4,...,A,2,小王,大王 各占一个槽位，槽位中存放该点数的张数
+# 计数向量为不可变元组，可直接作为字典键；PASS 对应全零向量
+RANKS = ['3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A', '2', '小王', '大王']
+RANK_INDEX = {card: i for i, card in enumerate(RANKS)}
+NUM_RANKS = len(RANKS)
+EMPTY_COUNTS: Tuple[int, ...] = (0,) * NUM_RANKS
+# 一副牌各点数的张数
+FULL_DECK: Tuple[int, ...] = (4,) * 13 + (1, 1)
+# 能参与顺子、连对、飞机的最大槽位（A）
+MAX_CHAIN_INDEX = RANK_INDEX['A']
+
+Counts = Tuple[int, ...]
+Cards = Union[List[str], Counts]
+
+
 class CardValidator:
     """斗地主牌型验证器"""
-    
+
     CARD_ORDER = {
         '3': 3, '4': 4, '5': 5, '6': 6, '7': 7, '8': 8, '9': 9, '10': 10,
         'J': 11, 'Q': 12, 'K': 13, 'A': 14, '2': 15, '小王': 16, '大王': 17
     }
-    
+
     @staticmethod
     def get_card_value(card: str) -> int:
         """获取牌的点数值"""
         if card in ['小王', '大王']:
             return CardValidator.CARD_ORDER[card]
         return CardValidator.CARD_ORDER.get(card, 0)
-    
-    
+
+    @staticmethod
+    def to_counts(cards: List[str]) -> Optional[Counts]:
+        """
+        将牌的字符串列表转换为计数向量
+        ['PASS'] 与空列表都转换为全零向量；含有无法识别的牌时返回 None
+        """
+        if cards == ['PASS']:
+            return EMPTY_COUNTS
+        counts = [0] * NUM_RANKS
+        for card in cards:
+            index = RANK_INDEX.get(card)
+            if index is None:
+                return None
+            counts[index] += 1
+        return tuple(counts)
+
+    @staticmethod
+    def to_cards(counts: Counts) -> List[str]:
+        """将计数向量转换为按点数从小到大排列的牌列表"""
+        cards = []
+        for index, count in enumerate(counts):
+            if count:
+                cards.extend([RANKS[index]] * count)
+        return cards
+
+    @classmethod
+    def move_to_cards(cls, move: Counts) -> List[str]:
+        """将出牌的计数向量转换为牌列表，全零向量对应 ['PASS']"""
+        return cls.to_cards(move) or ['PASS']
+
+    @classmethod
+    def _as_counts(cls, cards: Cards) -> Optional[Counts]:
+        """统一入参：计数向量原样返回，字符串列表在此处转换"""
+        if isinstance(cards, tuple):
+            return cards
+        return cls.to_counts(cards)
+
+    @staticmethod
+    def _add(counts: Counts, index: int, n: int) -> Counts:
+        """返回在某个槽位上增加 n 张后的计数向量"""
+        return counts[:index] + (counts[index] + n,) + counts[index + 1:]
+
+    @staticmethod
+    def _chain(start: int, length: int, n: int) -> Counts:
+        """构造从 start 槽位开始、连续 length 个点数、每个点数 n 张的计数向量"""
+        return (0,) * start + (n,) * length + (0,) * (NUM_RANKS - start - length)
+
     @classmethod
-    def identify_card_type(cls, cards: List[str]) -> Tuple[str, int]:
+    def identify_card_type(cls, cards: Cards) -> Tuple[str, int]:
         """
         识别牌型并返回(牌型, 主要点数)
+        cards 可以是牌的字符串列表，也可以是计数向量
         返回: (牌型名称, 主要牌的点数)
         """
-        if not cards:
-            return (CardType.INVALID, 0)
-        
-        if cards == ['PASS']:
+        card_type, value, _ = cls.classify(cards)
+        return (card_type, value)
+
+    @classmethod
+    def classify(cls, cards: Cards) -> Tuple[str, int, int]:
+        """
+        查表识别牌型，返回(牌型, 主要点数, 张数)
+        牌型表在导入时一次性构建，识别只需一次字典查找
+        """
+        if not isinstance(cards, tuple):
+            if not cards:
+                return INVALID_PATTERN
+            if cards == ['PASS']:
+                return PASS_PATTERN
+            cards = cls.to_counts(cards)
+            if cards is None:
+                return INVALID_PATTERN
+        return PATTERN_TABLE.get(cards, INVALID_PATTERN)
+
+    @staticmethod
+    def identify_reference(counts: Counts) -> Tuple[str, int]:
+        """
+        逐条规则识别牌型的参考实现，返回的点数为 槽位下标 + 3
+        仅用于校验牌型表（PATTERN_TABLE）的正确性，热路径请使用 identify_card_type
+        """
+        num_cards = sum(counts)
+        if num_cards == 0:
             return (CardType.PASS, 0)
-        # 统计每张牌的数量
-        try:
-            card_values = [cls.get_card_value(card) for card in cards]
-        except KeyError:
-            return (CardType.INVALID, 0)
-        face_counter = Counter(cards)
-        
-        num_cards = len(cards)
-        unique_faces = len(face_counter)
-        
+        # 按点数升序排列的 (槽位, 张数)
+        faces = [(index, count) for index, count in enumerate(counts) if count]
+        unique_faces = len(faces)
+        face_counts = sorted((count for _, count in faces), reverse=True)
+
         # 王炸
-        if num_cards == 2 and set(cards) == {'小王', '大王'}:
+        if num_cards == 2 and counts[13] == 1 and counts[14] == 1:
             return (CardType.ROCKET, 17)
-        
+
         # 炸弹：四张相同（纯炸弹，不带牌）
         if num_cards == 4 and unique_faces == 1:
-            return (CardType.BOMB, card_values[0])
-        
+            return (CardType.BOMB, faces[0][0] + 3)
+
         # 四带二单：四张相同 + 两张单牌
-        if num_cards == 6 and unique_faces == 3:
-            counts = sorted(face_counter.values(), reverse=True)
-            if counts == [4, 1, 1]:
-                bomb_face = [face for face, count in face_counter.items() if count == 4][0]
-                return (CardType.BOMB_WITH_SINGLES, cls.CARD_ORDER[bomb_face])
-        
+        if num_cards == 6 and unique_faces == 3 and face_counts == [4, 1, 1]:
+            return (CardType.BOMB_WITH_SINGLES, counts.index(4) + 3)
+
         # 四带二对：四张相同 + 一对
-        if num_cards == 6 and unique_faces == 2:
-            counts = sorted(face_counter.values(), reverse=True)
-            if counts == [4, 2]:
-                bomb_face = [face for face, count in face_counter.items() if count == 4][0]
-                return (CardType.BOMB_WITH_PAIR, cls.CARD_ORDER[bomb_face])
-        
+        if num_cards == 6 and unique_faces == 2 and face_counts == [4, 2]:
+            return (CardType.BOMB_WITH_PAIR, counts.index(4) + 3)
+
         # 四带二对（两对的情况）：四张相同 + 两对
-        if num_cards == 8 and unique_faces == 3:
-            counts = sorted(face_counter.values(), reverse=True)
-            if counts == [4, 2, 2]:
-                bomb_face = [face for face, count in face_counter.items() if count == 4][0]
-                return (CardType.BOMB_WITH_PAIR, cls.CARD_ORDER[bomb_face])
-        
+        if num_cards == 8 and unique_faces == 3 and face_counts == [4, 2, 2]:
+            return (CardType.BOMB_WITH_PAIR, counts.index(4) + 3)
+
         # 单张
         if num_cards == 1:
-            return (CardType.SINGLE, card_values[0])
-        
+            return (CardType.SINGLE, faces[0][0] + 3)
+
         # 对子
         if num_cards == 2 and unique_faces == 1:
-            return (CardType.PAIR, card_values[0])
-        
+            return (CardType.PAIR, faces[0][0] + 3)
+
         # 三张
         if num_cards == 3 and unique_faces == 1:
-            return (CardType.TRIPLE, card_values[0])
-        
+            return (CardType.TRIPLE, faces[0][0] + 3)
+
         # 三带一
-        if num_cards == 4 and unique_faces == 2:
-            counts = list(face_counter.values())
-            if 3 in counts and 1 in counts:
-                triple_face = [face for face, count in face_counter.items() if count == 3][0]
-                return (CardType.TRIPLE_WITH_SINGLE, cls.CARD_ORDER[triple_face])
-        
+        if num_cards == 4 and face_counts == [3, 1]:
+            return (CardType.TRIPLE_WITH_SINGLE, counts.index(3) + 3)
+
         # 三带二
-        if num_cards == 5 and unique_faces == 2:
-            counts = list(face_counter.values())
-            if 3 in counts and 2 in counts:
-                triple_face = [face for face, count in face_counter.items() if count == 3][0]
-                return (CardType.TRIPLE_WITH_PAIR, cls.CARD_ORDER[triple_face])
-        
+        if num_cards == 5 and face_counts == [3, 2]:
+            return (CardType.TRIPLE_WITH_PAIR, counts.index(3) + 3)
+
+        low, high = faces[0][0], faces[-1][0]
+        consecutive = high - low + 1 == unique_faces
+
         # 顺子：至少5张连续单张（不包括2和王）
         if num_cards >= 5 and unique_faces == num_cards:
-            sorted_values = sorted(card_values)
-            # 检查是否包含2或王
-            if any(v >= 15 for v in sorted_values):
-                return (CardType.INVALID, 0)
-            # 检查是否连续
-            if cls._is_consecutive(sorted_values):
-                return (CardType.STRAIGHT, sorted_values[-1])
-        
+            if high <= MAX_CHAIN_INDEX and consecutive:
+                return (CardType.STRAIGHT, high + 3)
+            return (CardType.INVALID, 0)
+
         # 连对：至少3对连续对子
-        if num_cards >= 6 and num_cards % 2 == 0 and all(count == 2 for count in face_counter.values()):
-            sorted_values = sorted(set(card_values))
-            if len(sorted_values) >= 3 and all(v < 15 for v in sorted_values):
-                if cls._is_consecutive(sorted_values):
-                    return (CardType.CONSECUTIVE_PAIRS, sorted_values[-1])
-        
+        if num_cards >= 6 and face_counts[0] == 2 and face_counts[-1] == 2:
+            if high <= MAX_CHAIN_INDEX and consecutive:
+                return (CardType.CONSECUTIVE_PAIRS, high + 3)
+
         # 飞机：至少2个连续的三张
-        triple_faces = [face for face, count in face_counter.items() if count == 3]
-        if len(triple_faces) >= 2:
-            triple_values = sorted([cls.CARD_ORDER[face] for face in triple_faces])
-            if all(v < 15 for v in triple_values) and cls._is_consecutive(triple_values):
-                # 纯飞机
-                if num_cards == len(triple_faces) * 3:
-                    return (CardType.AIRPLANE, triple_values[-1])
-                # 飞机带单
-                elif num_cards == len(triple_faces) * 4:
-                    return (CardType.AIRPLANE_WITH_SINGLES, triple_values[-1])
-                # 飞机带对
-                elif num_cards == len(triple_faces) * 5:
-                    pair_count = sum(1 for count in face_counter.values() if count == 2)
-                    if pair_count == len(triple_faces):
-                        return (CardType.AIRPLANE_WITH_PAIRS, triple_values[-1])
-        
+        triple_faces = [index for index, count in faces if count == 3]
+        num_triples = len(triple_faces)
+        if num_triples >= 2 and triple_faces[-1] <= MAX_CHAIN_INDEX \
+                and triple_faces[-1] - triple_faces[0] + 1 == num_triples:
+            top = triple_faces[-1] + 3
+            # 纯飞机
+            if num_cards == num_triples * 3:
+                return (CardType.AIRPLANE, top)
+            # 飞机带单
+            elif num_cards == num_triples * 4:
+                return (CardType.AIRPLANE_WITH_SINGLES, top)
+            # 飞机带对
+            elif num_cards == num_triples * 5:
+                pair_count = sum(1 for _, count in faces if count == 2)
+                if pair_count == num_triples:
+                    return (CardType.AIRPLANE_WITH_PAIRS, top)
+
         return (CardType.INVALID, 0)
-    
+
     @classmethod
-    def hint_all(cls,hand:list[str])->list[Tuple[str, int, List[str]]]:
-        """ 遍历所有牌型，给出当前手牌中可出的牌列表-即动作空间"""    
-        counter=Counter(hand)
-        singles=[f for f,c in counter.items()]
-        pairs=[f for f,c in counter.items() if c>=2]
-        triples=[f for f,c in counter.items() if c>=3]
-        bombs=[f for f,c in counter.items() if c==4]
-        rocket=hand.count('小王')>0 and hand.count('大王')>0
-        
-        action=[(CardType.PASS,0,['PASS'])]
-        # 王炸类型
-        if rocket:
-            action.append( (CardType.ROCKET, 17, ['小王','大王']) )
-        # 单排类型
-        for s in singles:
-            action.append( (CardType.SINGLE, cls.CARD_ORDER[s], [s]) )
-        # 对子类型
-        for p in pairs:
-            action.append( (CardType.PAIR, cls.CARD_ORDER[p], [p,p]) )
-        # 三张类型
-        for t in triples:
-            action.append( (CardType.TRIPLE, cls.CARD_ORDER[t], [t,t,t]) )
-        # 三带一类型
-        for t in triples:
-            for s in singles:
-                if s != t:
-                    action.append( (CardType.TRIPLE_WITH_SINGLE, cls.CARD_ORDER[t], [t,t,t,s]) )
-        # 三带二类型
-        for t in triples:
-            for p in pairs:
-                if p != t:
-                    action.append( (CardType.TRIPLE_WITH_PAIR, cls.CARD_ORDER[t], [t,t,t,p,p]) )
-        # 炸弹类型
-        for b in bombs:
-            action.append( (CardType.BOMB, cls.CARD_ORDER[b], [b,b,b,b]) )
-        # 四带二单类型
-        for b in bombs:
-            for s1 in singles:
-                for s2 in singles:
-                    if s1 != b and s2 != b and s1 != s2:
-                        action.append( (CardType.BOMB_WITH_SINGLES, cls.CARD_ORDER[b], [b,b,b,b,s1,s2]) )
-        # 四带二对类型
-        for b in bombs:
-            for p1 in pairs:
-                for p2 in pairs:
-                    if p1 != b and p2 != b and p1 != p2:
-                        action.append( (CardType.BOMB_WITH_PAIR, cls.CARD_ORDER[b], [b,b,b,b,p1,p1,p2,p2]) )
-        # 顺子类型：至少5张连续单张（不包括2和王）
-        for start in range(3, 11):  # 从3开始，最多到10开头的顺子（10-A最长）
-            for length in range(5, 13):  # 顺子长度5-12张
-                if start + length - 1 > 14:  # 不能包含2（点数15）
+    def hint_all(cls, hand: Cards, max_kickers: Optional[int] = None,
+                 rng: Optional[random.Random] = None) -> list[Tuple[str, int, List[str]]]:
+        """
+        遍历所有牌型，给出当前手牌中可出的牌列表-即动作空间
+        max_kickers/rng 用于限制或抽样每个主体的带牌方案，见 _limit_kickers
+        """
+        counts = cls._as_counts(hand)
+        action = [(CardType.PASS, 0, ['PASS'])]
+        for card_type, value, move in cls._iter_all_counts(counts, max_kickers, rng):
+            action.append((card_type, value, cls.move_to_cards(move)))
+        return action
+
+    @classmethod
+    def _iter_all_counts(cls, counts: Counts, max_kickers: Optional[int] = None,
+                         rng: Optional[random.Random] = None) -> Iterator[Tuple[str, int, Counts]]:
+        """ 按 hint_all 的牌型顺序逐个产出手牌中所有可出的牌（不含PASS）"""
+        for card_type, generator in cls._generators():
+            for value, move in generator(counts, 0, None, max_kickers, rng):
+                yield (card_type, value, move)
+
+    @classmethod
+    def _generators(cls) -> List[Tuple[str, Callable]]:
+        """
+        各牌型的出牌生成器，顺序即 hint_all 的牌型顺序
+        生成器签名为 gen(counts, above, length)：按主要点数从小到大产出 (点数, 计数向量)，
+        只产出主要点数大于 above 的出牌；length 不为 None 时只产出该张数的出牌
+        """
+        return [
+            (CardType.ROCKET, cls._gen_rocket),
+            (CardType.SINGLE, cls._gen_singles),
+            (CardType.PAIR, cls._gen_pairs),
+            (CardType.TRIPLE, cls._gen_triples),
+            (CardType.TRIPLE_WITH_SINGLE, cls._gen_triple_with_single),
+            (CardType.TRIPLE_WITH_PAIR, cls._gen_triple_with_pair),
+            (CardType.BOMB, cls._gen_bombs),
+            (CardType.BOMB_WITH_SINGLES, cls._gen_bomb_with_singles),
+            (CardType.BOMB_WITH_PAIR, cls._gen_bomb_with_pair),
+            (CardType.STRAIGHT, cls._gen_straights),
+            (CardType.CONSECUTIVE_PAIRS, cls._gen_consecutive_pairs),
+            (CardType.AIRPLANE, cls._gen_airplanes),
+            (CardType.AIRPLANE_WITH_SINGLES, cls._gen_airplane_with_singles),
+            (CardType.AIRPLANE_WITH_PAIRS, cls._gen_airplane_with_pairs),
+        ]
+
+    @classmethod
+    def _gen_rocket(cls, counts: Counts, above: int, length: Optional[int],
+                    max_kickers: Optional[int] = None, rng: Optional[random.Random] = None) -> Iterator[Tuple[int, Counts]]:
+        if counts[13] and counts[14] and above < 17:
+            yield (17, cls._chain(13, 2, 1))
+
+    @classmethod
+    def _gen_same(cls, counts: Counts, above: int, n: int, last: int) -> Iterator[Tuple[int, Counts]]:
+        """产出点数大于 above、由 n 张相同点数组成的牌，槽位不超过 last"""
+        for r in range(max(above - 2, 0), last + 1):
+            if counts[r] >= n:
+                yield (r + 3, cls._chain(r, 1, n))
+
+    @classmethod
+    def _gen_singles(cls, counts: Counts, above: int, length: Optional[int],
+                    max_kickers: Optional[int] = None, rng: Optional[random.Random] = None) -> Iterator[Tuple[int, Counts]]:
+        return cls._gen_same(counts, above, 1, NUM_RANKS - 1)
+
+    @classmethod
+    def _gen_pairs(cls, counts: Counts, above: int, length: Optional[int],
+                    max_kickers: Optional[int] = None, rng: Optional[random.Random] = None) -> Iterator[Tuple[int, Counts]]:
+        return cls._gen_same(counts, above, 2, RANK_INDEX['2'])
+
+    @classmethod
+    def _gen_triples(cls, counts: Counts, above: int, length: Optional[int],
+                    max_kickers: Optional[int] = None, rng: Optional[random.Random] = None) -> Iterator[Tuple[int, Counts]]:
+        return cls._gen_same(counts, above, 3, RANK_INDEX['2'])
+
+    @classmethod
+    def _gen_bombs(cls, counts: Counts, above: int, length: Optional[int],
+                    max_kickers: Optional[int] = None, rng: Optional[random.Random] = None) -> Iterator[Tuple[int, Counts]]:
+        return cls._gen_same(counts, above, 4, RANK_INDEX['2'])
+
+    @classmethod
+    def _gen_triple_with_single(cls, counts: Counts, above: int, length: Optional[int],
+                                max_kickers: Optional[int] = None, rng: Optional[random.Random] = None) -> Iterator[Tuple[int, Counts]]:
+        for value, triple in cls._gen_triples(counts, above, None):
+            t = value - 3
+            variants = (cls._add(triple, s, 1) for s in range(NUM_RANKS) if s != t and counts[s])
+            for move in cls._limit_kickers(variants, max_kickers, rng):
+                yield (value, move)
+
+    @classmethod
+    def _gen_triple_with_pair(cls, counts: Counts, above: int, length: Optional[int],
+                              max_kickers: Optional[int] = None, rng: Optional[random.Random] = None) -> Iterator[Tuple[int, Counts]]:
+        for value, triple in cls._gen_triples(counts, above, None):
+            t = value - 3
+            variants = (cls._add(triple, p, 2) for p in range(RANK_INDEX['2'] + 1) if p != t and counts[p] >= 2)
+            for move in cls._limit_kickers(variants, max_kickers, rng):
+                yield (value, move)
+
+    @classmethod
+    def _gen_bomb_with_singles(cls, counts: Counts, above: int, length: Optional[int],
+                               max_kickers: Optional[int] = None, rng: Optional[random.Random] = None) -> Iterator[Tuple[int, Counts]]:
+        for value, bomb in cls._gen_bombs(counts, above, None):
+            b = value - 3
+            singles = [i for i, c in enumerate(counts) if c >= 1 and i != b]
+            # 两张单牌按点数组合枚举，(s1, s2) 与 (s2, s1) 只出现一次
+            variants = (cls._add(cls._add(bomb, s1, 1), s2, 1) for s1, s2 in combinations(singles, 2))
+            for move in cls._limit_kickers(variants, max_kickers, rng):
+                yield (value, move)
+
+    @classmethod
+    def _gen_bomb_with_pair(cls, counts: Counts, above: int, length: Optional[int],
+                            max_kickers: Optional[int] = None, rng: Optional[random.Random] = None) -> Iterator[Tuple[int, Counts]]:
+        for value, bomb in cls._gen_bombs(counts, above, None):
+            b = value - 3
+            pairs = [i for i, c in enumerate(counts) if c >= 2 and i != b]
+            variants = []
+            # 四带一对（6张）
+            if length in (None, 6):
+                variants.extend(cls._add(bomb, p, 2) for p in pairs)
+            # 四带两对（8张），两对按点数组合枚举
+            if length in (None, 8):
+                variants.extend(cls._add(cls._add(bomb, p1, 2), p2, 2) for p1, p2 in combinations(pairs, 2))
+            for move in cls._limit_kickers(variants, max_kickers, rng):
+                yield (value, move)
+
+    @staticmethod
+    def _kicker_multisets(options: List[Tuple[int, int]], n: int) -> Iterator[List[Tuple[int, int]]]:
+        """
+        在 options=[(槽位, 可用张数)] 中按点数多重集枚举 n 张带牌，产出 [(槽位, 张数)]
+        同一点数只能带1、2或4张（带3张会构成新的三张），点数小的组合先产出
+        """
+        if n == 0:
+            yield []
+            return
+        for j, (rank, available) in enumerate(options):
+            for count in (1, 2, 4):
+                if count > available or count > n:
                     break
-                straight = []
-                valid = True
-                for i in range(length):
-                    card_value = start + i
-                    # 找到这个点数的牌
-                    card_str = [k for k, v in cls.CARD_ORDER.items() if v == card_value and k not in ['小王', '大王']][0]
-                    # 检查手中是否有这张牌
-                    matching_cards = [c for c in hand if cls.get_card_value(c) == card_value]
-                    if not matching_cards:
-                        valid = False
-                        break
-                    straight.append(matching_cards[0])
-                
-                if valid and len(straight) == length:
-                    action.append((CardType.STRAIGHT, start + length - 1, straight))
-        
+                for rest in CardValidator._kicker_multisets(options[j + 1:], n - count):
+                    yield [(rank, count)] + rest
+
+    @staticmethod
+    def _limit_kickers(variants: Iterable[Counts], max_kickers: Optional[int],
+                       rng: Optional[random.Random]) -> Iterable[Counts]:
+        """
+        限制同一主体（三张、炸弹、飞机）的带牌方案数量
+        max_kickers 为 None 时不限制；否则保留前 max_kickers 种（带牌点数最小的优先），
+        提供 rng 时改为随机抽样 max_kickers 种（保持原有顺序）
+        """
+        if max_kickers is None:
+            return variants
+        if rng is None:
+            return islice(variants, max_kickers)
+        variants = list(variants)
+        picked = sorted(rng.sample(range(len(variants)), min(max_kickers, len(variants))))
+        return [variants[i] for i in picked]
+
+    @staticmethod
+    def _chains(counts: Counts, width: int, min_length: int, max_length: int,
+                above: int = 0, length: Optional[int] = None) -> Iterator[Tuple[int, int]]:
+        """
+        产出手牌中所有 (起始槽位, 长度) 的连续段：段内每个点数至少 width 张，
+        长度在 [min_length, max_length] 之间（指定 length 时只取该长度），
+        不超过A（不含2和王），且最高点数大于 above；按最高点数从小到大产出
+        """
+        lengths = range(min_length, max_length + 1) if length is None else [length]
+        # run[i] 为以槽位 i 结尾、每个点数至少 width 张的连续段长度
+        run = 0
+        for top in range(MAX_CHAIN_INDEX + 1):
+            run = run + 1 if counts[top] >= width else 0
+            if top + 3 <= above:
+                continue
+            for n in lengths:
+                if n <= run:
+                    yield (top - n + 1, n)
+
+    @classmethod
+    def _gen_straights(cls, counts: Counts, above: int, length: Optional[int],
+                    max_kickers: Optional[int] = None, rng: Optional[random.Random] = None) -> Iterator[Tuple[int, Counts]]:
+        # 顺子类型：至少5张连续单张（不包括2和王）
+        for start, n in cls._chains(counts, 1, 5, 12, above, length):
+            yield (start + n + 2, cls._chain(start, n, 1))
+
+    @classmethod
+    def _gen_consecutive_pairs(cls, counts: Counts, above: int, length: Optional[int],
+                    max_kickers: Optional[int] = None, rng: Optional[random.Random] = None) -> Iterator[Tuple[int, Counts]]:
         # 连对类型：至少3对连续对子
-        for start in range(3, 13):  # 从3开始，最多到Q开头
-            for length in range(3, 11):  # 连对长度3-10对
-                if start + length - 1 > 14:  # 不能包含2
-                    break
-                consecutive_pairs = []
-                valid = True
-                for i in range(length):
-                    card_value = start + i
-                    # 找到这个点数的牌（至少要有2张）
-                    matching_cards = [c for c in hand if cls.get_card_value(c) == card_value]
-                    if len(matching_cards) < 2:
-                        valid = False
-                        break
-                    consecutive_pairs.extend(matching_cards[:2])
-                
-                if valid and len(consecutive_pairs) == length * 2:
-                    action.append((CardType.CONSECUTIVE_PAIRS, start + length - 1, consecutive_pairs))
-        
+        pairs = None if length is None else length // 2
+        for start, n in cls._chains(counts, 2, 3, 10, above, pairs):
+            yield (start + n + 2, cls._chain(start, n, 2))
+
+    @classmethod
+    def _gen_airplanes(cls, counts: Counts, above: int, length: Optional[int],
+                    max_kickers: Optional[int] = None, rng: Optional[random.Random] = None) -> Iterator[Tuple[int, Counts]]:
         # 飞机（纯）：至少2个连续的三张
-        for start in range(3, 13):  # 从3开始，最多到Q开头
-            for length in range(2, 6):  # 飞机长度2-5组
-                if start + length - 1 > 14:  # 不能包含2
-                    break
-                airplane = []
-                valid = True
-                for i in range(length):
-                    card_value = start + i
-                    # 找到这个点数的牌（至少要有3张）
-                    matching_cards = [c for c in hand if cls.get_card_value(c) == card_value]
-                    if len(matching_cards) < 3:
-                        valid = False
-                        break
-                    airplane.extend(matching_cards[:3])
-                
-                if valid and len(airplane) == length * 3:
-                    action.append((CardType.AIRPLANE, start + length - 1, airplane))
-        
+        triples = None if length is None else length // 3
+        for start, n in cls._chains(counts, 3, 2, 6, above, triples):
+            yield (start + n + 2, cls._chain(start, n, 3))
+
+    @classmethod
+    def _gen_airplane_with_singles(cls, counts: Counts, above: int, length: Optional[int],
+                                   max_kickers: Optional[int] = None, rng: Optional[random.Random] = None) -> Iterator[Tuple[int, Counts]]:
         # 飞机带单牌：n个连续三张 + n张单牌
-        for start in range(3, 13):
-            for length in range(2, 6):  # 飞机长度2-5组
-                if start + length - 1 > 14:
-                    break
-                airplane = []
-                valid = True
-                # 先检查三张部分
-                for i in range(length):
-                    card_value = start + i
-                    matching_cards = [c for c in hand if cls.get_card_value(c) == card_value]
-                    if len(matching_cards) < 3:
-                        valid = False
-                        break
-                    airplane.extend(matching_cards[:3])
-                
-                if valid:
-                    # 找单牌（不在飞机中的牌）
-                    used_values = set(range(start, start + length))
-                    available_singles = [c for c in hand if cls.get_card_value(c) not in used_values]
-                    
-                    # 需要length张单牌
-                    if len(available_singles) >= length:
-                        from itertools import combinations
-                        for single_combo in combinations(available_singles, length):
-                            full_airplane = airplane + list(single_combo)
-                            action.append((CardType.AIRPLANE_WITH_SINGLES, start + length - 1, full_airplane))
-        
+        triples = None if length is None else length // 4
+        for start, n in cls._chains(counts, 3, 2, 5, above, triples):
+            body = cls._chain(start, n, 3)
+            # 找单牌（不在飞机中的点数），按点数多重集枚举，相同的带牌组合只出现一次
+            options = [(i, c) for i, c in enumerate(counts) if c and not start <= i < start + n]
+            variants = (cls._with_kickers(body, kickers) for kickers in cls._kicker_multisets(options, n))
+            for move in cls._limit_kickers(variants, max_kickers, rng):
+                yield (start + n + 2, move)
+
+    @classmethod
+    def _gen_airplane_with_pairs(cls, counts: Counts, above: int, length: Optional[int],
+                                 max_kickers: Optional[int] = None, rng: Optional[random.Random] = None) -> Iterator[Tuple[int, Counts]]:
         # 飞机带对牌：n个连续三张 + n对
-        for start in range(3, 13):
-            for length in range(2, 6):  # 飞机长度2-5组
-                if start + length - 1 > 14:
-                    break
-                airplane = []
-                valid = True
-                # 先检查三张部分
-                for i in range(length):
-                    card_value = start + i
-                    matching_cards = [c for c in hand if cls.get_card_value(c) == card_value]
-                    if len(matching_cards) < 3:
-                        valid = False
-                        break
-                    airplane.extend(matching_cards[:3])
-                
-                if valid:
-                    # 找对子（不在飞机中的牌）
-                    used_values = set(range(start, start + length))
-                    available_pairs_dict = {}
-                    for card in hand:
-                        card_val = cls.get_card_value(card)
-                        if card_val not in used_values:
-                            available_pairs_dict[card] = available_pairs_dict.get(card, 0) + 1
-                    
-                    available_pairs = [c for c, count in available_pairs_dict.items() if count >= 2]
-                    
-                    # 需要length对
-                    if len(available_pairs) >= length:
-                        from itertools import combinations
-                        for pair_combo in combinations(available_pairs, length):
-                            pairs_cards = []
-                            for p in pair_combo:
-                                pairs_cards.extend([p, p])
-                            full_airplane = airplane + pairs_cards
-                            action.append((CardType.AIRPLANE_WITH_PAIRS, start + length - 1, full_airplane))
-        
-        return action
+        triples = None if length is None else length // 5
+        for start, n in cls._chains(counts, 3, 2, 4, above, triples):
+            body = cls._chain(start, n, 3)
+            available_pairs = [p for p in range(RANK_INDEX['2'] + 1)
+                               if counts[p] >= 2 and not start <= p < start + n]
+            variants = (cls._with_kickers(body, [(p, 2) for p in pair_combo])
+                        for pair_combo in combinations(available_pairs, n))
+            for move in cls._limit_kickers(variants, max_kickers, rng):
+                yield (start + n + 2, move)
+
+    @staticmethod
+    def _with_kickers(body: Counts, kickers: List[Tuple[int, int]]) -> Counts:
+        """在主体上加入 [(槽位, 张数)] 形式的带牌"""
+        move = list(body)
+        for rank, count in kickers:
+            move[rank] += count
+        return tuple(move)
 
     @staticmethod
     def _is_consecutive(values: List[int]) -> bool:
@@ -333,39 +457,43 @@ class CardValidator:
             if values[i + 1] - values[i] != 1:
                 return False
         return True
-    
+
     @classmethod
-    def can_beat(cls, current_cards: List[str], last_valid_play: List[str]) -> bool:
+    def can_beat(cls, current_cards: Cards, last_valid_play: Cards) -> bool:
         """
         判断当前牌是否能压过上一手牌
-        
+
         Args:
-            current_cards: 当前要出的牌
-            last_valid_play: 上一手的有效牌
-            
+            current_cards: 当前要出的牌（牌列表或计数向量）
+            last_valid_play: 上一手的有效牌（牌列表或计数向量），为空表示本轮首出
+
         Returns:
             bool: 是否能出
         """
+        current = cls._as_counts(current_cards)
+        previous = cls._as_counts(last_valid_play)
+        if current is None or previous is None:
+            return False
+        current_type, current_value, current_length = cls.classify(current)
+
         # PASS可以随时出
-        if current_cards == ['PASS'] and last_valid_play:
+        if current_type == CardType.PASS and any(previous):
             return True
-        
+
         # 如果上一手是没有有效牌型，当前牌只要有效即可
-        if not last_valid_play :
-            current_type, _ = cls.identify_card_type(current_cards)
+        if not any(previous):
             return current_type != CardType.INVALID and current_type != CardType.PASS
-        
-        current_type, current_value = cls.identify_card_type(current_cards)
-        previous_type, previous_value = cls.identify_card_type(last_valid_play)
-        
+
+        previous_type, previous_value, previous_length = cls.classify(previous)
+
         # 牌型无效
         if current_type == CardType.INVALID:
             return False
-        
+
         # 王炸可以压任何牌
         if current_type == CardType.ROCKET:
             return True
-        
+
         # 炸弹可以压除王炸和更大炸弹外的所有牌
         if current_type == CardType.BOMB:
             if previous_type == CardType.ROCKET:
@@ -373,7 +501,7 @@ class CardValidator:
             if previous_type == CardType.BOMB:
                 return current_value > previous_value
             return True
-        
+
         # # 四带二单和四带二对只能压同类型的炸弹
         # if current_type in [CardType.BOMB_WITH_SINGLES, CardType.BOMB_WITH_PAIR]:
         #     if previous_type == CardType.ROCKET:
@@ -381,44 +509,146 @@ class CardValidator:
         #     if previous_type in [CardType.BOMB, CardType.BOMB_WITH_SINGLES, CardType.BOMB_WITH_PAIR]:
         #         return current_value > previous_value
         #     return False
-        
+
         # 其他牌型必须类型相同且数量相同
         if current_type != previous_type:
             return False
-        
-        if len(current_cards) != len(last_valid_play):
+
+        if current_length != previous_length:
             return False
-        
+
         # 比较点数大小
         return current_value > previous_value
-    
-    @staticmethod
-    def has_cards(hand: List[str], cards_to_play: List[str]) -> bool:
+
+    @classmethod
+    def has_cards(cls, hand: Cards, cards_to_play: Cards) -> bool:
         """验证手牌中是否有要出的牌"""
         if cards_to_play == ['PASS']:
             return True
-        
-        hand_counter = Counter(hand)
-        play_counter = Counter(cards_to_play)
-        
-        for card, count in play_counter.items():
-            if hand_counter[card] < count:
+
+        hand_counts = cls._as_counts(hand)
+        play_counts = cls._as_counts(cards_to_play)
+        if hand_counts is None or play_counts is None:
+            return False
+
+        for have, need in zip(hand_counts, play_counts):
+            if have < need:
                 return False
         return True
 
     @classmethod
-    def hint(cls,hand:list[str],last_valid_play:list[str])->list[List[str]]:
-        """ 给出当前手牌中可出的牌列表-即动作空间"""    
-        all_actions=cls.hint_all(hand)
-        if not last_valid_play:
-            all_actions.remove( (CardType.PASS,0,['PASS']) )
-            return [action[2] for action in all_actions]
-        valid_actions=[]
-        for action in all_actions:
-            card_type, value, cards=action
-            if cls.can_beat(cards,last_valid_play):
-                valid_actions.append(cards)
-        return valid_actions
+    def hint(cls, hand: Cards, last_valid_play: Cards, max_kickers: Optional[int] = None,
+             rng: Optional[random.Random] = None) -> Iterator[List[str]]:
+        """ 逐个产出当前手牌中可出的牌-即动作空间，需要完整列表时使用 list(hint(...))"""
+        for move in cls.hint_counts(hand, last_valid_play, max_kickers, rng):
+            yield cls.move_to_cards(move)
+
+    @classmethod
+    def hint_counts(cls, hand: Cards, last_valid_play: Cards, max_kickers: Optional[int] = None,
+                    rng: Optional[random.Random] = None) -> Iterator[Counts]:
+        """
+        hint 的计数向量版本，惰性产出每手可出的牌
+        首出时产出全部牌型；跟牌时先产出PASS，再只枚举与上一手同牌型、同张数且点数更大的牌，
+        最后是炸弹和王炸，调用方可随时停止迭代或只取前k个
+        带牌按点数多重集枚举，每种出牌只出现一次；max_kickers/rng 可限制或抽样带牌方案
+        上一手含有无法识别的牌或不是合法牌型时，没有任何牌能压过它，不产出任何出牌
+        """
+        counts = cls._as_counts(hand)
+        previous = cls._as_counts(last_valid_play)
+        if previous is None:
+            return
+        if not any(previous):
+            for _, _, move in cls._iter_all_counts(counts, max_kickers, rng):
+                yield move
+            return
+
+        previous_type, previous_value, previous_length = cls.classify(previous)
+        if previous_type == CardType.INVALID:
+            return
+        yield EMPTY_COUNTS
+        if previous_type == CardType.ROCKET:
+            return
+        generators = dict(cls._generators())
+        for _, move in generators[previous_type](counts, previous_value, previous_length, max_kickers, rng):
+            yield move
+        if previous_type != CardType.BOMB:
+            for _, move in cls._gen_bombs(counts, 0, None):
+                yield move
+        for _, move in cls._gen_rocket(counts, 0, None):
+            yield move
+
+INVALID_PATTERN = (CardType.INVALID, 0, 0)
+PASS_PATTERN = (CardType.PASS, 0, 0)
+
+
+def _build_pattern_table() -> Dict[Counts, Tuple[str, int, int]]:
+    """
+    枚举所有合法出牌（不超过20张），建立 计数向量 -> (牌型, 主要点数, 张数) 的牌型表
+    枚举规则与 CardValidator.identify_reference 保持一致
+    """
+    table: Dict[Counts, Tuple[str, int, int]] = {EMPTY_COUNTS: PASS_PATTERN}
+    chain = CardValidator._chain
+    all_ranks = range(NUM_RANKS)
+    # 不含大小王的点数，只有这些点数能组成对子、三张、炸弹
+    plain_ranks = range(RANK_INDEX['2'] + 1)
+
+    def add(card_type: str, value: int, counts: List[int]):
+        move = tuple(counts)
+        table[move] = (card_type, value, sum(move))
+
+    def with_kickers(body: Counts, kickers: Tuple[int, ...], n: int) -> List[int]:
+        counts = list(body)
+        for k in kickers:
+            counts[k] += n
+        return counts
+
+    add(CardType.ROCKET, 17, chain(13, 2, 1))
+    for r in all_ranks:
+        add(CardType.SINGLE, r + 3, chain(r, 1, 1))
+    for r in plain_ranks:
+        add(CardType.PAIR, r + 3, chain(r, 1, 2))
+        add(CardType.TRIPLE, r + 3, chain(r, 1, 3))
+        add(CardType.BOMB, r + 3, chain(r, 1, 4))
+        triple, bomb = chain(r, 1, 3), chain(r, 1, 4)
+        singles = [s for s in all_ranks if s != r]
+        pairs = [p for p in plain_ranks if p != r]
+        for s in singles:
+            add(CardType.TRIPLE_WITH_SINGLE, r + 3, with_kickers(triple, (s,), 1))
+        for p in pairs:
+            add(CardType.TRIPLE_WITH_PAIR, r + 3, with_kickers(triple, (p,), 2))
+            add(CardType.BOMB_WITH_PAIR, r + 3, with_kickers(bomb, (p,), 2))
+        for kickers in combinations(singles, 2):
+            add(CardType.BOMB_WITH_SINGLES, r + 3, with_kickers(bomb, kickers, 1))
+        for kickers in combinations(pairs, 2):
+            add(CardType.BOMB_WITH_PAIR, r + 3, with_kickers(bomb, kickers, 2))
+
+    for start in range(MAX_CHAIN_INDEX + 1):
+        for length in range(1, MAX_CHAIN_INDEX + 2 - start):
+            top = start + length + 2
+            if length >= 5:
+                add(CardType.STRAIGHT, top, chain(start, length, 1))
+            if 3 <= length <= 10:
+                add(CardType.CONSECUTIVE_PAIRS, top, chain(start, length, 2))
+            if 2 <= length <= 6:
+                add(CardType.AIRPLANE, top, chain(start, length, 3))
+            body = chain(start, length, 3)
+            outside = [r for r in all_ranks if not start <= r < start + length]
+            # 飞机带单：带牌按点数多重集枚举，同一点数可带1、2或4张（带3张会变成另一组三张）
+            if 2 <= length <= 5:
+                for kickers in combinations_with_replacement(outside, length):
+                    kicker_counts = Counter(kickers)
+                    if any(c == 3 or c > 4 or (k >= 13 and c > 1) for k, c in kicker_counts.items()):
+                        continue
+                    add(CardType.AIRPLANE_WITH_SINGLES, top, with_kickers(body, kickers, 1))
+            # 飞机带对：带互不相同的对子，不能带王
+            if 2 <= length <= 4:
+                for kickers in combinations([r for r in outside if r in plain_ranks], length):
+                    add(CardType.AIRPLANE_WITH_PAIRS, top, with_kickers(body, kickers, 2))
+    return table
+
+
+# 牌型表：导入时构建一次，约两万余项
+PATTERN_TABLE = _build_pattern_table()
 
 # 测试代码
 if __name__ == '__main__':
@@ -444,6 +674,34 @@ if __name__ == '__main__':
     for cards, expected in test_cases:
         card_type, value = validator.identify_card_type(cards)
         print(f"{cards} -> {card_type} (点数: {value}), 预期: {expected}")
+
+    # 校验牌型表与逐条规则的参考实现一致（双向）：
+    # 1. 表中每一项，参考实现给出相同的牌型与点数
+    # 2. 参考实现认为合法的牌都在表中：穷举不超过6张的所有牌，以及表中每一项增减一张得到的牌
+    mismatches = [move for move, (card_type, value, _) in PATTERN_TABLE.items()
+                  if validator.identify_reference(move) != (card_type, value)]
+    assert not mismatches, f"牌型表与参考实现不一致: {mismatches[:5]}"
+    limits = [4] * 13 + [1, 1]
+
+    def small_moves(rank: int, left: int):
+        if rank == NUM_RANKS:
+            yield ()
+            return
+        for n in range(min(limits[rank], left) + 1):
+            for rest in small_moves(rank + 1, left - n):
+                yield (n,) + rest
+
+    candidates = set(small_moves(0, 6))
+    for move in PATTERN_TABLE:
+        for r in range(NUM_RANKS):
+            for delta in (-1, 1):
+                n = move[r] + delta
+                if 0 <= n <= limits[r] and sum(move) + delta <= 20:
+                    candidates.add(move[:r] + (n,) + move[r + 1:])
+    missing = [move for move in candidates
+               if validator.identify_reference(move)[0] != CardType.INVALID and move not in PATTERN_TABLE]
+    assert not missing, f"参考实现认为合法但不在牌型表中: {missing[:5]}"
+    print(f"\n牌型表共 {len(PATTERN_TABLE)} 项，与参考实现双向校验 {len(candidates)} 种牌，全部一致")
     
     # 测试能否压牌
     print("\n=== 测试压牌 ===")
@@ -454,8 +712,8 @@ if __name__ == '__main__':
     print("四带二对能否压三张:", validator.can_beat(['6', '6', '6', '6', '3', '3'], ['5', '5', '5']))
     
     example_hand = ['3', '3', '3', '4', '4', '4', '5', '6', '7', '8']
-    actions = validator.hint(example_hand)
+    actions = validator.hint(example_hand, [])
     print("\n=== 可出牌列表 ===")
     for action in actions:
         print(action,end=' -> ')
-        print(validator.identify_card_type(action[2]))
\ No newline at end of file
+        print(validator.identify_card_type(action))
\ No newline at end of file
@@ -1,58 +1,179 @@
-from Agent.base_agent import BaseAgent
-from Agent.llm_client import AgentsLLM
-from typing import Dict, List
-from .card_validator import CardValidator
+import hashlib
+import numbers
+import random
+import struct
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+from .card_validator import CardValidator, Counts, EMPTY_COUNTS, FULL_DECK, NUM_RANKS
+from . import move_table
+from .card_tracker import CardTracker, TrackerState
+from .event_log import EventLog
+from .move_table import PASS_ID
 from utils import logger
 cards= ['3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A', '2', 'JOKER', 'JOKER']
 # suits = ['', '', '', '']
+# 出牌顺序：地主 -> 农民甲 -> 农民乙
+PLAYERS = ["地主", "农民甲", "农民乙"]
+# 洗牌用的牌组（54张牌的点数槽位）与发牌后每个位置的归属：每人17张，最后3张为底牌
+DECK = [r for r, n in enumerate(FULL_DECK) for _ in range(n)]
+DEAL_OWNERS = [0] * 17 + [1] * 17 + [2] * 17 + [3] * 3
+_DEAL_KEYS = struct.Struct(f'<{len(DECK)}Q')
+# 发牌种子只取低64位
+SEED_MASK = (1 << 64) - 1
+
+
+def deal(seed: int) -> Tuple[Tuple[Counts, Counts, Counts], Counts]:
+    """
+    由种子确定一局的发牌，相同种子在任何平台上总是得到相同的发牌（种子取低64位）
+    用 SHAKE-256 把种子扩展为每张牌一个64位随机键，按键排序即为洗牌结果；
+    不依赖 random 模块的实现细节，对局记录中的种子在不同 Python 版本下都能还原发牌
+    返回 (按 PLAYERS 顺序的手牌计数向量（地主含底牌）, 底牌计数向量)
+    """
+    keys = _DEAL_KEYS.unpack(hashlib.shake_256(struct.pack('<Q', seed & SEED_MASK)).digest(_DEAL_KEYS.size))
+    counts = [[0] * NUM_RANKS for _ in range(4)]
+    for owner, card in zip(DEAL_OWNERS, sorted(range(len(DECK)), key=keys.__getitem__)):
+        counts[owner][DECK[card]] += 1
+    bottom = tuple(counts[3])
+    landlord = tuple(c + b for c, b in zip(counts[0], bottom))
+    return (landlord, tuple(counts[1]), tuple(counts[2])), bottom
+
+
+class EnvState(NamedTuple):
+    """
+    Env 的紧凑不可变快照，用于搜索时保存与恢复局面
+    lead_moves 是由手牌推出的可首出集合，Env 只会整体替换而不会原地修改这些列表，
+    因此快照直接引用而不复制；num_events 用于恢复时截断事件日志
+    """
+    hands: Tuple[Counts, Counts, Counts]  # 按 PLAYERS 顺序的手牌计数向量
+    current_player: str
+    last_move: int
+    pass_count: int
+    round: int
+    lead_moves: Tuple[List[int], List[int], List[int]]
+    num_events: int
+    tracker: TrackerState
+
 
 class Env:
-    def __init__(self):
-        self.history: List[str] = []
-        self.hands: Dict[str, List[str]] = {
-            "地主": [],
-            "农民甲": [],
-            "农民乙": []
+    def __init__(self, max_kickers: Optional[int] = None, seed: Optional[int] = None):
+        """
+        Args:
+            max_kickers: Observe 返回的动作空间中每个主体（三张、炸弹、飞机）最多保留的带牌方案数，
+                为 None 时列出全部方案；不影响 step 对出牌合法性的判断
+            seed: 本环境随机数生成器的种子，reset 未指定种子时从中抽取每局的种子；
+                为 None 时使用全局 random 模块，random.seed() 仍能复现对局
+        """
+        self.max_kickers = max_kickers
+        self.rng: Optional[random.Random] = random.Random(seed) if seed is not None else None
+        self.seed: Optional[int] = None  # 本局发牌的种子
+        self.round: int = 0  # 当前回合数
+        # 只追加的出牌事件日志，文字历史由 self.history 按需渲染
+        self.events = EventLog(PLAYERS, self.round)
+        # 记牌器：各家已出的牌、未出现的牌与推测，随出牌增量更新
+        self.tracker = CardTracker(PLAYERS)
+        # 手牌以计数向量保存，self.hands 属性在需要时转换为牌列表
+        self.hand_counts: Dict[str, Counts] = {
+            "地主": EMPTY_COUNTS,
+            "农民甲": EMPTY_COUNTS,
+            "农民乙": EMPTY_COUNTS
         }
         self.bottom_cards: List[str] = []
+        # 发牌时各玩家的手牌（地主含底牌），与当前手牌相减即为已打出的牌
+        self._dealt: Dict[str, Counts] = dict(self.hand_counts)
         self.current_player: str = "地主"
         self.state: str = "游戏开始，准备发牌阶段"
         self.validator = CardValidator()
-        self.last_valid_play: List[str] = []  # 记录最后一次有效出牌
+        self.last_move: int = PASS_ID  # 记录最后一次有效出牌的出牌ID，PASS_ID 表示本轮尚无有效出牌
         self.pass_count: int = 0  # 连续PASS计数
-        self.round: int = 0  # 当前回合数
-    def reset(self):
-        import random
-        
-        self.history = []
-        self.hands = {
-            "地主": [],
-            "农民甲": [],
-            "农民乙": []
-        }
+        # 动作空间的增量维护：每个玩家手牌中所有可首出的出牌ID（升序），出牌后只剔除受影响的出牌
+        self._lead_moves: Dict[str, List[int]] = {}
+        # (手牌, 上一手出牌ID) -> 动作空间，同一局内相同局面直接复用
+        self._action_cache: Dict[Tuple[Counts, int], List[int]] = {}
+        # 缓存的 Observe 结果，局面变化时置为 None
+        self._observation = None
+        # 撤销栈：每次成功的 step 压入出牌前的快照
+        self._undo: List[EnvState] = []
+    def reset(self, seed: Optional[int] = None):
+        """
+        开始新的一局
+        Args:
+            seed: 本局发牌的种子，相同种子发出相同的牌；为 None 时从本环境的随机数生成器抽取。
+                任意整数均可，self.seed 记录的是 deal 实际使用的低64位
+        """
         self.current_player = "地主"
         self.state = "游戏开始，准备发牌阶段"
-        self.last_valid_play = []
+        self.last_move = PASS_ID
         self.pass_count = 0
-        # 生成完整牌组：52张普通牌 + 2张王牌 = 54张
-        deck = []
-        for card in cards[:-2]:  # 3到2
-            for i in range(4):
-                deck.append(f"{card}")
-        deck.append("小王")
-        deck.append("大王")
-        
-        # 洗牌
-        random.shuffle(deck)
+        if seed is None:
+            seed = (self.rng or random).getrandbits(63)
+        seed &= SEED_MASK
+        self.seed = seed
         
         # 发牌：每人17张，剩余3张作为底牌
-        self.hands["地主"] = sorted(deck[0:17]+deck[51:54], key=lambda x: self._card_sort_key(x))
-        self.hands["农民甲"] = sorted(deck[17:34], key=lambda x: self._card_sort_key(x))
-        self.hands["农民乙"] = sorted(deck[34:51], key=lambda x: self._card_sort_key(x))
-        self.bottom_cards = sorted(deck[51:54], key=lambda x: self._card_sort_key(x))
+        hands, bottom = deal(seed)
+        self.hand_counts = dict(zip(PLAYERS, hands))
+        self.bottom_cards = self.validator.to_cards(bottom)
+        self.tracker.reset(hands, bottom)
+        self._dealt = dict(self.hand_counts)
+        self._lead_moves = {player: sorted(move_table.legal_moves(counts)) for player, counts in self.hand_counts.items()}
+        self._action_cache = {}
+        self._observation = None
+        self._undo = []
         
-        self.state = f"底牌为：{self.bottom_cards}\n 各玩家手中牌数：\n地主{len(self.hands['地主'])}张\n农民甲{len(self.hands['农民甲'])}张\n农民乙{len(self.hands['农民乙'])}张"
-        self.history.append(f"游戏开始\n回合{self.round}\n")
+        self.state = self._render_state()
+        self.events = EventLog(PLAYERS, self.round)
+
+    @property
+    def history(self) -> List[str]:
+        """文字形式的对局历史（提示词与界面使用），由事件日志增量渲染，每条事件只渲染一次"""
+        return self.events.lines()
+
+    @property
+    def hands(self) -> Dict[str, List[str]]:
+        """各玩家手牌的牌列表（按点数从小到大排列）"""
+        return {player: self.validator.to_cards(counts) for player, counts in self.hand_counts.items()}
+
+    @property
+    def dealt_counts(self) -> Dict[str, Counts]:
+        """发牌时各玩家的手牌（计数向量，地主含底牌）"""
+        return dict(self._dealt)
+
+    @property
+    def played_counts(self) -> Dict[str, Counts]:
+        """各玩家已打出的牌（计数向量），属于公开信息"""
+        return {player: tuple(d - h for d, h in zip(self._dealt[player], counts))
+                for player, counts in self.hand_counts.items()}
+
+    @classmethod
+    def from_state(cls, hands: Dict[str, Counts], current_player: str = "地主", last_move: int = PASS_ID,
+                   pass_count: int = 0, max_kickers: Optional[int] = None,
+                   bottom_cards: Optional[List[str]] = None) -> "Env":
+        """
+        从给定局面构造环境，用于搜索中的确定化采样、残局复盘或从对局记录重放
+        已打出的牌无从得知，视为发牌即为 hands；bottom_cards 为底牌（可选）
+        """
+        env = cls(max_kickers)
+        env.hand_counts = dict(hands)
+        env._dealt = dict(hands)
+        if bottom_cards:
+            env.bottom_cards = sorted(bottom_cards, key=env._card_sort_key)
+        env.tracker.reset(tuple(env.hand_counts[player] for player in PLAYERS),
+                          env.validator.to_counts(env.bottom_cards))
+        env.current_player = current_player
+        env.last_move = last_move
+        env.pass_count = pass_count
+        env._lead_moves = {player: sorted(move_table.legal_moves(counts)) for player, counts in hands.items()}
+        env.state = env._render_state()
+        return env
+
+    @property
+    def last_valid_play(self) -> List[str]:
+        """最后一次有效出牌的牌列表，本轮尚无有效出牌时为空列表"""
+        return self.validator.to_cards(move_table.MOVES[self.last_move])
+
+    def _render_state(self) -> str:
+        """生成当前游戏状态描述"""
+        left = {player: sum(counts) for player, counts in self.hand_counts.items()}
+        return f"底牌为：{self.bottom_cards}\n 各玩家手中牌数：\n地主{left['地主']}张\n农民甲{left['农民甲']}张\n农民乙{left['农民乙']}张"
     def _card_sort_key(self, card: str):
         """用于排序的辅助函数，按牌的大小排序"""
         card_order = ['3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A', '2']
@@ -66,49 +187,63 @@ class Env:
                 return card_order.index(card)
             return 0
 
-    def step(self, player: str, decision: list[str]) -> tuple[bool, str]:
-        """执行一步游戏，添加规则验证"""
+    def step(self, player: str, decision: Union[list[str], int]) -> tuple[bool, str]:
+        """
+        执行一步游戏，添加规则验证
+        decision 可以是牌列表（如 ['3','3'] 或 ['PASS']），也可以是出牌ID（见 move_table）
+        """
+        
+        # 出牌在此处转换为出牌ID，之后的验证与结算都基于出牌表
+        # 出牌ID可以是 numpy 整数（batch_mask / VecEnv 的输出），布尔值不是出牌ID
+        if isinstance(decision, bool):
+            move = None
+        elif isinstance(decision, numbers.Integral):
+            move = int(decision) if 0 <= decision < move_table.NUM_MOVES else None
+            if move is not None:
+                decision = move_table.move_cards(move)
+        else:
+            move = move_table.move_id(decision)
+        hand = self.hand_counts[player]
         
         # 1. 验证牌型是否有效
-        card_type, _ = self.validator.identify_card_type(decision)
-        if card_type == "无效牌型":
+        if move is None:
             err_message = f"❌ {player} 出牌失败：无效的牌型 {decision}"
             
             return (False,err_message)
         
         # 2. 验证手中是否有这些牌
-        if not self.validator.has_cards(self.hands[player], decision):
+        if not move_table.contains(hand, move):
             err_message = f"❌ {player} 出牌失败：手中没有这些牌 {decision}"
             return (False, err_message)
-        if not self.last_valid_play and decision == ['PASS']:
+        if self.last_move == PASS_ID and move == PASS_ID:
             err_message = f"❌ {player} 出牌失败：本轮尚无有效出牌，不能选择PASS，轮到你出牌"
             return (False, err_message)
         # 3. 验证是否能压过上一手牌
-        if not self.validator.can_beat(decision, self.last_valid_play):
+        if not move_table.beats(move, self.last_move):
             err_message = f"❌ {player} 出牌失败：无法压过上一手牌"
             err_message += f"\n   上一手: {self.last_valid_play}"
             err_message += f"\n   当前出: {decision}"
             return (False, err_message)
         
-        # 4. 记录历史
-        self.history.append(f"{player}： {decision}")
+        # 4. 记录快照（用于撤销），更新记牌器
+        self._undo.append(self.snapshot())
+        self.tracker.update(PLAYERS.index(player), move, self.last_move)
         
         # 5. 更新最后有效出牌和PASS计数
-        if decision == ['PASS']:
+        if move == PASS_ID:
             self.pass_count += 1
             # 连续两家PASS，清空最后出牌记录（下家可以出任意牌）
             if self.pass_count >= 2:
-                self.last_valid_play = []
+                self.last_move = PASS_ID
                 self.pass_count = 0
                 self.round += 1
-                self.history.append(f"\n回合{self.round}\n")
         else:
-            self.last_valid_play = decision
+            self.last_move = move
             self.pass_count = 0
             # 移除已出的牌
-            for card in decision:
-                if card in self.hands[player]:
-                    self.hands[player].remove(card)
+            self.hand_counts[player] = move_table.play(hand, move)
+            self._update_lead_moves(player, move)
+        self.events.append(PLAYERS.index(player), move, self.round)
         
         # 6. 切换到下一个玩家
         if self.current_player == "地主":
@@ -119,19 +254,123 @@ class Env:
             self.current_player = "地主"
         
         # 7. 更新状态
-        self.state = f"底牌为：{self.bottom_cards}\n 各玩家手中牌数：\n地主{len(self.hands['地主'])}张\n农民甲{len(self.hands['农民甲'])}张\n农民乙{len(self.hands['农民乙'])}张"
+        self.state = self._render_state()
+        self._observation = None
         
         return (True, "出牌成功")
+    def snapshot(self) -> EnvState:
+        """保存当前局面，只记录计数向量与少量标量，开销与手牌张数无关"""
+        counts, lead = self.hand_counts, self._lead_moves
+        return EnvState(
+            (counts["地主"], counts["农民甲"], counts["农民乙"]),
+            self.current_player, self.last_move, self.pass_count, self.round,
+            (lead["地主"], lead["农民甲"], lead["农民乙"]),
+            len(self.events),
+            self.tracker.state,
+        )
+
+    def restore(self, snapshot: EnvState):
+        """
+        恢复到 snapshot 保存的局面
+        事件日志按快照时的长度截断，因此只应恢复到本局中更早的局面（搜索回溯的用法）
+        """
+        self.hand_counts = dict(zip(PLAYERS, snapshot.hands))
+        self._lead_moves = dict(zip(PLAYERS, snapshot.lead_moves))
+        self.current_player = snapshot.current_player
+        self.last_move = snapshot.last_move
+        self.pass_count = snapshot.pass_count
+        self.round = snapshot.round
+        self.events.truncate(snapshot.num_events)
+        self.tracker.state = snapshot.tracker
+        self.state = self._render_state()
+        self._observation = None
+
+    def undo(self) -> bool:
+        """撤销最近一次成功的 step，没有可撤销的出牌时返回 False"""
+        if not self._undo:
+            return False
+        self.restore(self._undo.pop())
+        return True
+
+    def clone(self) -> "Env":
+        """
+        复制一个可独立推进的 Env，代替 copy.deepcopy
+        计数向量与可首出集合不会被原地修改，直接共享；动作空间缓存只取决于 (手牌, 上一手)，也一并共享
+        """
+        env = Env.__new__(Env)
+        env.__dict__.update(self.__dict__)
+        env.hand_counts = dict(self.hand_counts)
+        env._lead_moves = dict(self._lead_moves)
+        env.events = self.events.copy()
+        env.tracker = self.tracker.copy()
+        env._undo = []
+        env._observation = None
+        return env
+
     def game_over(self) -> bool:
         # 游戏结束判断逻辑省略
-        for player, hand in self.hands.items():
-            if len(hand) == 0:
+        for player, counts in self.hand_counts.items():
+            if not any(counts):
                 return True
         return False
 
     def render(self):
         logger.info("当前游戏状态：" + self.state)
-        logger.info("游戏历史：" + '\n'.join(self.history))
+        logger.info("游戏历史：" + self.events.text())
     def Observe(self)->tuple[str,List[str],List[List[str]],List[str],str]:
-        """返回当前游戏的观察信息"""
-        return self.current_player, self.hands[self.current_player],self.validator.hint(self.hands[self.current_player],self.last_valid_play), self.history, self.state,
\ No newline at end of file
+        """
+        返回当前游戏的观察信息，局面未变化时重复调用直接返回缓存结果
+        返回的状态描述末尾附有当前玩家视角的记牌信息
+        """
+        if self._observation is None:
+            hand = self.hand_counts[self.current_player]
+            action_space = [move_table.move_cards(move) for move in self.legal_moves()]
+            state = f"{self.state}\n{self.tracker_prompt()}"
+            self._observation = (self.current_player, self.validator.to_cards(hand), action_space, self.history, state)
+        return self._observation
+
+    def tracker_view(self, player: Optional[str] = None) -> Dict[str, object]:
+        """player（默认为当前玩家）视角的结构化记牌信息，见 CardTracker.view"""
+        player = player or self.current_player
+        return self.tracker.view(PLAYERS.index(player), self.hand_counts[player], self._cards_left())
+
+    def tracker_prompt(self, player: Optional[str] = None) -> str:
+        """player（默认为当前玩家）视角的记牌信息，用于提示词"""
+        player = player or self.current_player
+        return self.tracker.prompt(PLAYERS.index(player), self.hand_counts[player], self._cards_left())
+
+    def _cards_left(self) -> Tuple[int, ...]:
+        return tuple(sum(self.hand_counts[player]) for player in PLAYERS)
+
+    def legal_moves(self) -> List[int]:
+        """
+        当前玩家的全部合法出牌ID（按ID升序），跟牌时第一项为 PASS_ID
+        由增量维护的可首出集合按上一手截取得到，并按 (手牌, 上一手) 缓存
+        """
+        hand = self.hand_counts[self.current_player]
+        key = (hand, self.last_move)
+        moves = self._action_cache.get(key)
+        if moves is None:
+            moves = move_table.follow_moves(self._lead_moves[self.current_player], self.last_move)
+            if self.max_kickers is not None:
+                moves = self._limit_kickers(moves)
+            self._action_cache[key] = moves
+        return moves
+
+    def _update_lead_moves(self, player: str, move: int):
+        """出牌后只重新检查与打出的点数有关的出牌，其余出牌仍然可出"""
+        hand = self.hand_counts[player]
+        removed = move_table.MOVE_RANK_MASK[move]
+        rank_mask = move_table.MOVE_RANK_MASK
+        self._lead_moves[player] = [m for m in self._lead_moves[player]
+                                    if not rank_mask[m] & removed or move_table.contains(hand, m)]
+
+    def _limit_kickers(self, moves: List[int]) -> List[int]:
+        """每个 (牌型, 张数, 主要点数) 只保留前 max_kickers 种带牌方案（ID小的带牌点数小）"""
+        kept, seen = [], {}
+        for move in moves:
+            key = (move_table.MOVE_TYPE[move], move_table.MOVE_LENGTH[move], move_table.MOVE_RANK[move])
+            seen[key] = seen.get(key, 0) + 1
+            if seen[key] <= self.max_kickers:
+                kept.append(move)
+        return kept
@@ -0,0 +1,177 @@
+"""
+残局求解器：三家剩余牌数不多时，在完全信息（三家手牌均已知）下精确求解胜负
+
+地主一方与农民一方是零和的二值博弈（地主胜/农民胜），在二值上做 alpha-beta：
+地主结点找到一个必胜的出牌即截断，农民结点找到一个让地主必败的出牌即截断。
+局面用 Zobrist 哈希编码（三家手牌各点数的张数、当前座位、上一手出牌ID、连续PASS数），
+出牌时增量更新哈希；置换表记录每个局面的胜负与最佳出牌，跨局面、跨局复用。
+"""
+import random
+import threading
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from . import move_table
+from .card_validator import Counts, NUM_RANKS
+from .doudizhu import Env, PLAYERS
+from .move_table import MOVE_LENGTH, MOVES, PASS_ID
+
+NUM_SEATS = len(PLAYERS)
+LANDLORD = 0
+
+_rng = random.Random(20240601)
+# ZOBRIST_HAND[座位][槽位][张数]
+ZOBRIST_HAND = [[[_rng.getrandbits(64) for _ in range(5)] for _ in range(NUM_RANKS)] for _ in range(NUM_SEATS)]
+ZOBRIST_SEAT = [_rng.getrandbits(64) for _ in range(NUM_SEATS)]
+ZOBRIST_PASS = [_rng.getrandbits(64) for _ in range(2)]
+ZOBRIST_LAST = [_rng.getrandbits(64) for _ in range(move_table.NUM_MOVES)]
+# 每手出牌涉及的槽位，用于增量更新哈希
+MOVE_RANKS = [tuple(r for r, c in enumerate(move) if c) for move in MOVES]
+
+
+def zobrist(hands: Tuple[Counts, ...], seat: int, last_move: int, pass_count: int) -> int:
+    """局面的 Zobrist 哈希"""
+    h = ZOBRIST_SEAT[seat] ^ ZOBRIST_LAST[last_move] ^ ZOBRIST_PASS[pass_count]
+    for s, hand in enumerate(hands):
+        table = ZOBRIST_HAND[s]
+        for r, c in enumerate(hand):
+            h ^= table[r][c]
+    return h
+
+
+@lru_cache(maxsize=1 << 16)
+def _lead_moves(hand: Counts) -> List[int]:
+    """手牌的全部可首出出牌ID（升序）"""
+    return sorted(move_table.legal_moves(hand))
+
+
+class SearchAborted(Exception):
+    """搜索结点数超过上限"""
+
+
+class EndgameSolver:
+    """
+    残局求解器
+
+    Args:
+        max_cards: 三家剩余牌数之和不超过该值时才求解
+        max_nodes: 单次求解最多展开的结点数，超过后放弃（返回 None）
+        max_table: 置换表的最大项数，超过后清空
+    同一个求解器可以被多个线程共享（如推测执行中的代理副本），solve 加锁串行执行，置换表照常复用
+    """
+
+    def __init__(self, max_cards: int = 15, max_nodes: int = 50000, max_table: int = 1 << 20):
+        self.max_cards = max_cards
+        self.max_nodes = max_nodes
+        self.max_table = max_table
+        # 哈希 -> (地主是否必胜, 最佳出牌)
+        self.table: Dict[int, Tuple[bool, int]] = {}
+        self.nodes = 0
+        self._lock = threading.Lock()
+
+    def applicable(self, env: Env) -> bool:
+        """当前局面是否在求解范围内"""
+        return not env.game_over() and sum(sum(counts) for counts in env.hand_counts.values()) <= self.max_cards
+
+    def solve(self, env: Env) -> Optional[Tuple[int, bool]]:
+        """
+        求解 env 的当前局面
+
+        Returns:
+            (最佳出牌ID, 当前玩家一方是否必胜)；不在求解范围内或超过结点上限时返回 None。
+            必败时返回的出牌只是合法出牌之一
+        """
+        if not self.applicable(env):
+            return None
+        hands = tuple(env.hand_counts[player] for player in PLAYERS)
+        seat = PLAYERS.index(env.current_player)
+        h = zobrist(hands, seat, env.last_move, env.pass_count)
+        with self._lock:
+            if len(self.table) > self.max_table:
+                self.table.clear()
+            self.nodes = 0
+            try:
+                landlord_wins = self._search(hands, seat, env.last_move, env.pass_count, h)
+            except SearchAborted:
+                return None
+            move = self.table[h][1]
+        return move, landlord_wins == (seat == LANDLORD)
+
+    def _search(self, hands: Tuple[Counts, ...], seat: int, last_move: int, pass_count: int, h: int) -> bool:
+        """返回地主一方是否必胜，并把结果与最佳出牌写入置换表"""
+        entry = self.table.get(h)
+        if entry is not None:
+            return entry[0]
+        self.nodes += 1
+        if self.nodes > self.max_nodes:
+            raise SearchAborted()
+
+        landlord = seat == LANDLORD
+        hand = hands[seat]
+        left = sum(hand)
+        next_seat = (seat + 1) % NUM_SEATS
+        h_turn = h ^ ZOBRIST_SEAT[seat] ^ ZOBRIST_SEAT[next_seat] ^ ZOBRIST_LAST[last_move] ^ ZOBRIST_PASS[pass_count]
+
+        best_move = None
+        for move in self._ordered_moves(hand, last_move):
+            if move == PASS_ID:
+                if pass_count == 1:
+                    # 连续两家PASS，下家首出
+                    child_last, child_pass = PASS_ID, 0
+                else:
+                    child_last, child_pass = last_move, 1
+                child = h_turn ^ ZOBRIST_LAST[child_last] ^ ZOBRIST_PASS[child_pass]
+                result = self._search(hands, next_seat, child_last, child_pass, child)
+            elif MOVE_LENGTH[move] == left:
+                # 出完手牌，本方获胜
+                result = landlord
+            else:
+                new_hand = move_table.play(hand, move)
+                child = h_turn ^ ZOBRIST_LAST[move] ^ ZOBRIST_PASS[0]
+                table = ZOBRIST_HAND[seat]
+                for r in MOVE_RANKS[move]:
+                    child ^= table[r][hand[r]] ^ table[r][new_hand[r]]
+                child_hands = hands[:seat] + (new_hand,) + hands[seat + 1:]
+                result = self._search(child_hands, next_seat, move, 0, child)
+            if best_move is None or result == landlord:
+                best_move = move
+            if result == landlord:
+                # 本方必胜，剪枝
+                break
+        # 剪枝时 result 为本方必胜，否则所有出牌都是本方必败
+        self.table[h] = (result, best_move)
+        return result
+
+    @staticmethod
+    def _ordered_moves(hand: Counts, last_move: int) -> List[int]:
+        """出牌排序：张数多的牌在前（能出完的牌最先尝试），PASS 放在最后"""
+        moves = move_table.follow_moves(_lead_moves(hand), last_move)
+        return sorted(moves, key=lambda m: (m == PASS_ID, -MOVE_LENGTH[m]))
+
+
+if __name__ == '__main__':
+    import time
+
+    random.seed(7)
+    env = Env()
+    solver = EndgameSolver(max_cards=15)
+    solved = 0
+    for game in range(20):
+        env.reset()
+        # 随机出牌直到进入残局
+        while not env.game_over() and not solver.applicable(env):
+            env.step(env.current_player, random.choice(env.legal_moves()))
+        if env.game_over():
+            continue
+        start = time.perf_counter()
+        result = solver.solve(env)
+        elapsed = time.perf_counter() - start
+        left = {player: sum(counts) for player, counts in env.hand_counts.items()}
+        if result is None:
+            print(f"第{game}局 剩余 {left}: 超过结点上限 ({elapsed * 1000:.1f}ms)")
+            continue
+        solved += 1
+        move, wins = result
+        print(f"第{game}局 剩余 {left} {env.current_player} 出 {move_table.move_cards(move)} "
+              f"{'必胜' if wins else '必败'}, 结点 {solver.nodes}, {elapsed * 1000:.1f}ms")
+    print(f"求解 {solved} 局, 置换表 {len(solver.table)} 项")
@@ -0,0 +1,159 @@
+"""
+对局事件日志：只追加的出牌记录，按字段存放在紧凑数组中
+
+每条事件记录 座位、出牌ID、牌型编号、出牌后的回合数 和 时间戳，可按下标随机访问。
+提示词与界面使用的文字历史按需渲染并缓存，新事件只渲染一次，
+"最近N手"、"本轮出牌"等视图也按日志长度缓存，避免每回合重复拼接整局历史。
+"""
+import time
+from array import array
+from typing import Dict, List, NamedTuple, Sequence
+
+from .move_table import MOVE_TYPE, PASS_ID, TYPE_ORDER, move_cards
+
+
+class Event(NamedTuple):
+    seat: int
+    move: int
+    type: int  # move_table.TYPE_ORDER 中的牌型编号
+    round: int  # 出牌后的回合数，与上一条事件不同表示这一手之后开始了新的一轮
+    timestamp: float
+
+    @property
+    def type_name(self) -> str:
+        return TYPE_ORDER[self.type]
+
+
+class EventLog:
+    """
+    只追加的事件日志
+
+    Args:
+        players: 座位编号对应的玩家名称
+        start_round: 第一条事件之前的回合数
+    """
+
+    def __init__(self, players: Sequence[str], start_round: int = 0):
+        self.players = list(players)
+        self.start_round = start_round
+        self.seats = array('B')
+        self.moves = array('H')
+        self.types = array('B')
+        self.rounds = array('I')
+        self.timestamps = array('d')
+        # 已渲染的文字历史，_line_start[i] 为第 i 条事件之前的行数
+        self._lines: List[str] = [f"游戏开始\n回合{start_round}\n"]
+        self._line_start = array('I')
+        self._views: Dict[tuple, object] = {}
+
+    def __len__(self) -> int:
+        return len(self.moves)
+
+    def __getitem__(self, i: int) -> Event:
+        return Event(self.seats[i], self.moves[i], self.types[i], self.rounds[i], self.timestamps[i])
+
+    def append(self, seat: int, move: int, round: int):
+        self.seats.append(seat)
+        self.moves.append(move)
+        self.types.append(MOVE_TYPE[move])
+        self.rounds.append(round)
+        self.timestamps.append(time.time())
+
+    def truncate(self, n: int):
+        """只保留前 n 条事件（撤销出牌时使用）"""
+        if n >= len(self):
+            return
+        for column in (self.seats, self.moves, self.types, self.rounds, self.timestamps):
+            del column[n:]
+        if n < len(self._line_start):
+            del self._lines[self._line_start[n]:]
+            del self._line_start[n:]
+        self._views.clear()
+
+    def copy(self) -> "EventLog":
+        log = EventLog.__new__(EventLog)
+        log.players = self.players
+        log.start_round = self.start_round
+        log.seats, log.moves, log.types = array('B', self.seats), array('H', self.moves), array('B', self.types)
+        log.rounds, log.timestamps = array('I', self.rounds), array('d', self.timestamps)
+        log._lines = list(self._lines)
+        log._line_start = array('I', self._line_start)
+        log._views = {}
+        return log
+
+    # ---------------- 文字渲染 ----------------
+
+    def render(self, i: int) -> str:
+        """第 i 条事件的文字，与原先 history 中的格式相同"""
+        return f"{self.players[self.seats[i]]}： {move_cards(self.moves[i])}"
+
+    def lines(self) -> List[str]:
+        """
+        整局的文字历史（开局行、每手出牌、新一轮的回合行），只渲染上次之后新增的事件
+        返回的列表会随日志增长而原地追加
+        """
+        previous = self.rounds[len(self._line_start) - 1] if self._line_start else self.start_round
+        for i in range(len(self._line_start), len(self)):
+            self._line_start.append(len(self._lines))
+            self._lines.append(self.render(i))
+            if self.rounds[i] != previous:
+                previous = self.rounds[i]
+                self._lines.append(f"\n回合{previous}\n")
+        return self._lines
+
+    def text(self) -> str:
+        """整局文字历史拼接成的字符串，按日志长度缓存"""
+        return self._view(('text',), lambda: "\n".join(self.lines()))
+
+    # ---------------- 视图 ----------------
+
+    def last(self, n: int) -> List[Event]:
+        """最近 n 条事件"""
+        return self._view(('last', n), lambda: [self[i] for i in range(max(0, len(self) - n), len(self))])
+
+    def last_plays(self, n: int) -> List[Event]:
+        """最近 n 手非PASS出牌"""
+        def build():
+            plays = []
+            for i in range(len(self) - 1, -1, -1):
+                if self.moves[i] != PASS_ID:
+                    plays.append(self[i])
+                    if len(plays) == n:
+                        break
+            return plays[::-1]
+        return self._view(('last_plays', n), build)
+
+    def since_reset(self) -> List[Event]:
+        """本轮（上一次连续两家PASS之后）的全部事件"""
+        def build():
+            current = self.rounds[-1] if len(self) else self.start_round
+            i = len(self)
+            while i > 0 and self.rounds[i - 1] == current and (i < 2 or self.rounds[i - 2] == current):
+                i -= 1
+            return [self[j] for j in range(i, len(self))]
+        return self._view(('since_reset',), build)
+
+    def _view(self, key: tuple, build):
+        """按 (视图, 日志长度) 缓存视图结果"""
+        cached = self._views.get(key)
+        if cached is not None and cached[0] == len(self):
+            return cached[1]
+        value = build()
+        self._views[key] = (len(self), value)
+        return value
+
+
+if __name__ == '__main__':
+    import random
+    from .doudizhu import Env
+
+    random.seed(0)
+    env = Env()
+    env.reset()
+    while not env.game_over():
+        env.step(env.current_player, random.choice(env.legal_moves()))
+    log = env.events
+    print(f"共 {len(log)} 条事件，第一条：{log[0]}")
+    print("最近3手出牌：", [(log.players[e.seat], move_cards(e.move)) for e in log.last_plays(3)])
+    print("本轮事件：", [(log.players[e.seat], move_cards(e.move)) for e in log.since_reset()])
+    print(log.text()[-200:])
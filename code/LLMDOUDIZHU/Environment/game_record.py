@@ -0,0 +1,272 @@
+"""
+紧凑的二进制对局记录：发牌种子 + 出牌ID序列
+
+单条记录的布局（小端序）：
+    种子 uint64 | 出牌步数 uint16 | 出牌ID uint16 × 步数
+发牌不单独保存，由 doudizhu.deal(种子) 确定地还原；
+出牌按座位轮流（地主先出），获胜者即最后一手的出牌者，无需另外保存。
+一局约 50 步，整条记录约 110 字节；全部字段都按 2 字节对齐，整个文件可以直接按 uint16 内存映射。
+
+记录追加写入按大小分块的文件（目录下的 games-00000.ddzr、games-00001.ddzr ...），
+每个文件以 8 字节文件头开始。RecordFile 通过内存映射读取单个文件，iter_records 流式读取整个目录，
+replay 按记录重建任意回合的 Env。
+"""
+import mmap
+import os
+import struct
+import threading
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from .card_validator import Counts
+from .doudizhu import Env, PLAYERS, deal
+
+MAGIC = b'DDZR'
+VERSION = 2
+FILE_HEADER = struct.Struct('<4sHH')  # 魔数、版本号、保留
+RECORD_HEADER = struct.Struct('<QH')  # 种子、出牌步数
+CHUNK_BYTES = 64 << 20
+SUFFIX = '.ddzr'
+
+
+class GameRecord(NamedTuple):
+    seed: int
+    moves: Tuple[int, ...]
+
+    @property
+    def winner(self) -> str:
+        return PLAYERS[(len(self.moves) - 1) % len(PLAYERS)]
+
+    @property
+    def hands(self) -> Tuple[Counts, Counts, Counts]:
+        """按 PLAYERS 顺序的发牌（地主含底牌），由种子还原"""
+        return deal(self.seed)[0]
+
+    @property
+    def bottom(self) -> Counts:
+        return deal(self.seed)[1]
+
+    @classmethod
+    def from_env(cls, env: Env) -> "GameRecord":
+        """从 Env 的发牌种子与事件日志生成记录；只有由 reset 按种子发牌的对局才能记录"""
+        if env.seed is None:
+            raise ValueError("对局不是由种子发牌的（如 Env.from_state 构造的局面），无法记录")
+        return cls(env.seed, tuple(env.events.moves))
+
+    def encode(self) -> bytes:
+        return RECORD_HEADER.pack(self.seed, len(self.moves)) + struct.pack(f'<{len(self.moves)}H', *self.moves)
+
+
+def decode(data, offset: int = 0) -> Tuple[GameRecord, int]:
+    """从 data 的 offset 处解码一条记录，返回 (记录, 下一条记录的偏移)"""
+    seed, num_moves = RECORD_HEADER.unpack_from(data, offset)
+    offset += RECORD_HEADER.size
+    moves = struct.unpack_from(f'<{num_moves}H', data, offset)
+    return GameRecord(seed, moves), offset + 2 * num_moves
+
+
+# ---------------- 写入 ----------------
+
+class RecordWriter:
+    """
+    把对局记录追加写入目录下按大小分块的文件，线程安全
+
+    Args:
+        directory: 记录目录，不存在时自动创建
+        chunk_bytes: 单个分块文件的大小上限，超过后换下一个文件
+    """
+
+    def __init__(self, directory: str, chunk_bytes: int = CHUNK_BYTES):
+        self.directory = directory
+        self.chunk_bytes = chunk_bytes
+        self._lock = threading.Lock()
+        self._file = None
+        os.makedirs(directory, exist_ok=True)
+        chunks = chunk_paths(directory)
+        self._index = len(chunks) - 1 if chunks else 0
+
+    def write(self, record: GameRecord):
+        self.write_encoded(record.encode())
+
+    def write_encoded(self, data: bytes):
+        """写入已编码的记录（可以是多条记录拼接），用于汇总多个进程的结果"""
+        with self._lock:
+            if self._file is None or self._file.tell() >= self.chunk_bytes:
+                self._open_chunk()
+            self._file.write(data)
+            self._file.flush()
+
+    def _open_chunk(self):
+        if self._file is not None:
+            self._file.close()
+            self._index += 1
+        while True:
+            path = os.path.join(self.directory, f"games-{self._index:05d}{SUFFIX}")
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            if size < self.chunk_bytes:
+                break
+            self._index += 1
+        self._file = open(path, 'ab')
+        if size == 0:
+            self._file.write(FILE_HEADER.pack(MAGIC, VERSION, 0))
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ---------------- 读取 ----------------
+
+def chunk_paths(directory: str) -> List[str]:
+    """目录下的全部分块文件（按写入顺序）"""
+    if not os.path.isdir(directory):
+        return []
+    return [os.path.join(directory, name) for name in sorted(os.listdir(directory)) if name.endswith(SUFFIX)]
+
+
+class RecordFile:
+    """
+    内存映射读取单个分块文件
+    打开时只扫描记录头建立偏移索引，记录内容在访问时才解码；
+    words 是整个文件的 uint16 视图，moves(i) 直接返回其中的切片而不复制
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _ = FILE_HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"不是对局记录文件或版本不支持：{path}")
+        self.words = np.frombuffer(self._mmap, dtype='<u2')
+        offsets = []
+        offset, end = FILE_HEADER.size, len(self._mmap)
+        unpack = RECORD_HEADER.unpack_from
+        while offset + RECORD_HEADER.size <= end:
+            num_moves = unpack(self._mmap, offset)[1]
+            if offset + RECORD_HEADER.size + 2 * num_moves > end:
+                break  # 写入中断留下的不完整记录
+            offsets.append(offset)
+            offset += RECORD_HEADER.size + 2 * num_moves
+        self.offsets = np.array(offsets, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __getitem__(self, i: int) -> GameRecord:
+        return decode(self._mmap, int(self.offsets[i]))[0]
+
+    def __iter__(self) -> Iterator[GameRecord]:
+        for offset in self.offsets:
+            yield decode(self._mmap, int(offset))[0]
+
+    def moves(self, i: int) -> np.ndarray:
+        """第 i 条记录的出牌ID序列（文件的只读视图）"""
+        start = (int(self.offsets[i]) + RECORD_HEADER.size) // 2
+        return self.words[start:start + self.num_moves(i)]
+
+    def num_moves(self, i: int) -> int:
+        return int(self.words[(int(self.offsets[i]) + 8) // 2])
+
+    def seeds(self) -> np.ndarray:
+        """全部记录的种子"""
+        words = self.offsets // 2
+        seeds = np.zeros(len(self), dtype=np.uint64)
+        for k in range(4):
+            seeds |= self.words[words + k].astype(np.uint64) << np.uint64(16 * k)
+        return seeds
+
+    def close(self):
+        """关闭映射；moves() 返回的视图须先释放"""
+        self.words = None
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_records(directory: str) -> Iterator[GameRecord]:
+    """按写入顺序流式读取目录下的全部记录"""
+    for path in chunk_paths(directory):
+        with RecordFile(path) as records:
+            yield from records
+
+
+# ---------------- 重放 ----------------
+
+def initial_env(record: GameRecord, max_kickers: Optional[int] = None) -> Env:
+    """按记录的种子重新发牌，构造开局的 Env"""
+    env = Env(max_kickers)
+    env.reset(record.seed)
+    return env
+
+
+def replay_iter(record: GameRecord, max_kickers: Optional[int] = None) -> Iterator[Env]:
+    """
+    依次产出开局及每一步出牌之后的 Env
+    产出的是同一个 Env 对象，需要保留某一回合的局面时请调用 clone()
+    """
+    env = initial_env(record, max_kickers)
+    yield env
+    for move in record.moves:
+        ok, message = env.step(env.current_player, int(move))
+        if not ok:
+            raise ValueError(f"对局记录与规则不符：{message}")
+        yield env
+
+
+def replay(record: GameRecord, turn: Optional[int] = None, max_kickers: Optional[int] = None) -> Env:
+    """重建打出前 turn 手之后的 Env，turn 为 None 时重放整局"""
+    turn = len(record.moves) if turn is None else turn
+    if not 0 <= turn <= len(record.moves):
+        raise IndexError(f"回合超出范围：{turn}")
+    for i, env in enumerate(replay_iter(record, max_kickers)):
+        if i == turn:
+            return env
+
+
+if __name__ == '__main__':
+    import random
+    import tempfile
+    import time
+
+    random.seed(0)
+    directory = tempfile.mkdtemp()
+    games = 2000
+    env = Env()
+    with RecordWriter(directory, chunk_bytes=64 << 10) as writer:
+        for _ in range(games):
+            env.reset()
+            while not env.game_over():
+                env.step(env.current_player, random.choice(env.legal_moves()))
+            writer.write(GameRecord.from_env(env))
+    size = sum(os.path.getsize(path) for path in chunk_paths(directory))
+    print(f"{games} 局写入 {len(chunk_paths(directory))} 个文件，共 {size} 字节，平均每局 {size / games:.1f} 字节")
+
+    start = time.perf_counter()
+    records = list(iter_records(directory))
+    print(f"流式读取 {len(records)} 局: {(time.perf_counter() - start) * 1e6 / len(records):.1f}us/局")
+
+    record = records[-1]
+    assert replay(record).game_over()
+    assert tuple(initial_env(record).dealt_counts[player] for player in PLAYERS) == record.hands
+
+    # 任意整数种子都按 deal 实际使用的低64位记录
+    env.reset(seed=-1)
+    negative = decode(GameRecord.from_env(env).encode())[0]
+    assert negative.seed == (1 << 64) - 1 and initial_env(negative).dealt_counts == env.dealt_counts
+    middle = replay(record, len(record.moves) // 2)
+    print(f"最后一局 {len(record.moves)} 手，{record.winner}获胜；第{len(record.moves) // 2}手后各家剩余：",
+          {player: sum(counts) for player, counts in middle.hand_counts.items()})
@@ -0,0 +1,191 @@
+"""
+全局出牌表：把斗地主所有合法出牌（PATTERN_TABLE 中的全部牌型）枚举一次，
+每手牌分配一个稳定的整数ID，并把牌型、主要点数、张数、计数向量存放在扁平数组中。
+出牌合法性与大小比较因此只需数组下标访问，ID序列也可作为日志与训练数据的紧凑编码。
+"""
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .card_validator import (CardType, CardValidator, Cards, Counts, EMPTY_COUNTS,
+                             NUM_RANKS, PATTERN_TABLE)
+
+# 牌型编号：ID 按 (牌型编号, 张数, 主要点数, 计数向量) 排序，保证不同进程、不同版本间ID稳定
+TYPE_ORDER = [
+    CardType.PASS,
+    CardType.SINGLE,
+    CardType.PAIR,
+    CardType.TRIPLE,
+    CardType.TRIPLE_WITH_SINGLE,
+    CardType.TRIPLE_WITH_PAIR,
+    CardType.STRAIGHT,
+    CardType.CONSECUTIVE_PAIRS,
+    CardType.AIRPLANE,
+    CardType.AIRPLANE_WITH_SINGLES,
+    CardType.AIRPLANE_WITH_PAIRS,
+    CardType.BOMB_WITH_SINGLES,
+    CardType.BOMB_WITH_PAIR,
+    CardType.BOMB,
+    CardType.ROCKET,
+]
+TYPE_ID = {card_type: i for i, card_type in enumerate(TYPE_ORDER)}
+BOMB_TYPE = TYPE_ID[CardType.BOMB]
+ROCKET_TYPE = TYPE_ID[CardType.ROCKET]
+
+
+def _sort_key(move: Counts) -> Tuple[int, int, int, Tuple[int, ...]]:
+    card_type, value, length = PATTERN_TABLE[move]
+    # 计数向量倒序比较，使带牌点数小的出牌排在前面
+    return (TYPE_ID[card_type], length, value, move[::-1])
+
+
+# ID -> 计数向量
+MOVES: List[Counts] = sorted(PATTERN_TABLE, key=_sort_key)
+# 计数向量 -> ID
+MOVE_ID: Dict[Counts, int] = {move: i for i, move in enumerate(MOVES)}
+NUM_MOVES = len(MOVES)
+PASS_ID = MOVE_ID[EMPTY_COUNTS]
+
+# 扁平数组形式的出牌元数据，下标即出牌ID
+MOVE_TYPE = array('B', (TYPE_ID[PATTERN_TABLE[move][0]] for move in MOVES))
+MOVE_RANK = array('B', (PATTERN_TABLE[move][1] for move in MOVES))
+MOVE_LENGTH = array('B', (PATTERN_TABLE[move][2] for move in MOVES))
+# 计数向量按行展开，第 i 手牌的计数向量为 MOVE_COUNTS[i * NUM_RANKS:(i + 1) * NUM_RANKS]
+MOVE_COUNTS = array('B', (count for move in MOVES for count in move))
+
+# 出牌涉及的点数位掩码：第 r 位为1表示这手牌含有槽位 r 的牌
+MOVE_RANK_MASK = array('H', (sum(1 << r for r, count in enumerate(move) if count) for move in MOVES))
+
+# 按 (牌型, 张数) 分桶，桶内ID按主要点数升序排列
+BUCKETS: Dict[Tuple[int, int], List[int]] = {}
+for _move_id in range(NUM_MOVES):
+    BUCKETS.setdefault((MOVE_TYPE[_move_id], MOVE_LENGTH[_move_id]), []).append(_move_id)
+
+# 压牌关系：BEAT_START[i] 为第 i 手牌所在桶中第一个点数更大的出牌位置，
+# 能压过第 i 手牌的同牌型出牌即 BUCKETS[...][BEAT_START[i]:]
+BEAT_START = array('H', bytes(2 * NUM_MOVES))
+for _bucket in BUCKETS.values():
+    _start = len(_bucket)
+    for _pos in range(len(_bucket) - 1, -1, -1):
+        _move_id = _bucket[_pos]
+        if _pos + 1 < len(_bucket) and MOVE_RANK[_bucket[_pos + 1]] > MOVE_RANK[_move_id]:
+            _start = _pos + 1
+        BEAT_START[_move_id] = _start
+
+BOMB_IDS = BUCKETS[(BOMB_TYPE, 4)]
+ROCKET_ID = BUCKETS[(ROCKET_TYPE, 2)][0]
+
+
+def beater_range(previous: int) -> Tuple[int, int]:
+    """
+    能压过 previous 的同牌型出牌的ID区间 [lo, hi)：同一桶的ID连续且按点数升序，
+    桶内点数更大的出牌正好构成一个连续区间（炸弹、王炸不在其中）
+    """
+    bucket = BUCKETS[(MOVE_TYPE[previous], MOVE_LENGTH[previous])]
+    hi = bucket[-1] + 1
+    start = BEAT_START[previous]
+    return (bucket[start] if start < len(bucket) else hi, hi)
+
+
+def move_id(cards: Cards) -> Optional[int]:
+    """牌列表或计数向量 -> 出牌ID，不是合法牌型时返回 None"""
+    if isinstance(cards, list) and not cards:
+        return None
+    counts = CardValidator._as_counts(cards)
+    if counts is None:
+        return None
+    return MOVE_ID.get(counts)
+
+
+def move_cards(move: int) -> List[str]:
+    """出牌ID -> 牌列表，PASS 对应 ['PASS']"""
+    return CardValidator.move_to_cards(MOVES[move])
+
+
+def move_type(move: int) -> str:
+    """出牌ID -> 牌型名称"""
+    return TYPE_ORDER[MOVE_TYPE[move]]
+
+
+def contains(hand: Counts, move: int) -> bool:
+    """手牌中是否有这手牌"""
+    for have, need in zip(hand, MOVES[move]):
+        if have < need:
+            return False
+    return True
+
+
+def beats(move: int, previous: int) -> bool:
+    """
+    判断出牌 move 能否压过上一手 previous，语义与 CardValidator.can_beat 相同
+    previous 为 PASS_ID 表示本轮首出
+    """
+    if previous == PASS_ID:
+        return move != PASS_ID
+    if move == PASS_ID or move == ROCKET_ID:
+        return True
+    current_type, previous_type = MOVE_TYPE[move], MOVE_TYPE[previous]
+    if current_type == BOMB_TYPE:
+        if previous_type == ROCKET_TYPE:
+            return False
+        return previous_type != BOMB_TYPE or MOVE_RANK[move] > MOVE_RANK[previous]
+    return (current_type == previous_type and MOVE_LENGTH[move] == MOVE_LENGTH[previous]
+            and MOVE_RANK[move] > MOVE_RANK[previous])
+
+
+def beaters(previous: int) -> Iterator[int]:
+    """产出所有能压过 previous 的出牌ID（不考虑手牌）：同桶更大的牌、炸弹、王炸"""
+    previous_type = MOVE_TYPE[previous]
+    if previous == PASS_ID or previous_type == ROCKET_TYPE:
+        return
+    bucket = BUCKETS[(previous_type, MOVE_LENGTH[previous])]
+    yield from bucket[BEAT_START[previous]:]
+    if previous_type != BOMB_TYPE:
+        yield from BOMB_IDS
+    yield ROCKET_ID
+
+
+def legal_moves(hand: Counts, previous: int = PASS_ID, max_kickers: Optional[int] = None) -> List[int]:
+    """
+    当前手牌在上一手为 previous 时的全部合法出牌ID，顺序与 CardValidator.hint 相同
+    （跟牌时第一项为 PASS_ID）
+    """
+    return [MOVE_ID[move] for move in CardValidator.hint_counts(hand, MOVES[previous], max_kickers)]
+
+
+def follow_moves(lead_moves: List[int], previous: int) -> List[int]:
+    """
+    从手牌的全部可首出出牌（ID升序）中截取上一手为 previous 时的合法出牌：
+    同桶的ID区间、炸弹与王炸，跟牌时第一项为 PASS_ID
+    """
+    if previous == PASS_ID:
+        return lead_moves
+    if previous == ROCKET_ID:
+        return [PASS_ID]
+    lo, hi = beater_range(previous)
+    moves = [PASS_ID] + lead_moves[bisect_left(lead_moves, lo):bisect_left(lead_moves, hi)]
+    if MOVE_TYPE[previous] != BOMB_TYPE:
+        # 炸弹和王炸的ID排在最后
+        moves += lead_moves[bisect_left(lead_moves, BOMB_IDS[0]):]
+    elif ROCKET_ID in lead_moves[-1:]:
+        moves.append(ROCKET_ID)
+    return moves
+
+
+def play(hand: Counts, move: int) -> Counts:
+    """返回打出这手牌后的手牌计数向量"""
+    base = move * NUM_RANKS
+    return tuple(have - MOVE_COUNTS[base + i] for i, have in enumerate(hand))
+
+
+if __name__ == '__main__':
+    print(f"出牌总数: {NUM_MOVES}")
+    for card_type in TYPE_ORDER:
+        ids = [i for i in range(NUM_MOVES) if TYPE_ORDER[MOVE_TYPE[i]] == card_type]
+        print(f"{card_type}: {len(ids)} 手, ID {ids[0]}-{ids[-1]}")
+
+    previous = move_id(['3', '4', '5', '6', '7'])
+    hand = CardValidator.to_counts(['4', '5', '6', '7', '8', '9', '9', '9', '9', '小王', '大王'])
+    print(f"\n上一手 {move_cards(previous)} (ID {previous})")
+    for move in legal_moves(hand, previous):
+        print(f"  ID {move}: {move_cards(move)} 能压过: {beats(move, previous)}")
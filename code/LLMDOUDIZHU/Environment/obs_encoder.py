@@ -0,0 +1,138 @@
+"""
+观察编码器：把 Env 的局面编码为定长的 NumPy 特征向量（需要 numpy）
+
+所有特征都取自 Env 中随出牌增量维护的结构（记牌器的已出牌与未出牌、事件日志末尾的出牌ID），
+编码一次只读取最近 history_len 手出牌，与对局长度无关，也不接触任何字符串。
+座位一律按相对观察者的顺序排列：0 为自己，1 为下家，2 为上家。
+
+特征（按顺序拼接为 float32 向量，各段形状见 ObservationEncoder.shapes）：
+    hand        (15,)    自己的手牌计数
+    unseen      (15,)    其他玩家手中的牌（未出现的牌）计数
+    played      (3, 15)  各座位已打出的牌
+    cards_left  (3,)     各座位剩余张数
+    role        (3,)     各座位是否为地主
+    last_move   (15,)    本轮最后一手有效出牌的计数，首出时全零
+    last_type   (15,)    最后一手有效出牌的牌型（独热，move_table.TYPE_ORDER 顺序），首出时为 PASS
+    last_seat   (3,)     最后一手有效出牌的座位（独热），首出时全零
+    history     (K, 15)  最近 K 手出牌（含PASS）的计数，最早的在前，不足 K 手时前面补零
+    history_seat (K, 3)  最近 K 手出牌的座位（独热），补零的行全零
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .batch_mask import COUNTS
+from .card_validator import NUM_RANKS
+from .doudizhu import Env, PLAYERS
+from .move_table import MOVE_TYPE, TYPE_ORDER
+
+NUM_SEATS = len(PLAYERS)
+LANDLORD = 0
+NUM_TYPES = len(TYPE_ORDER)
+HISTORY_LEN = 15
+
+
+class ObservationEncoder:
+    """
+    定长观察编码器
+
+    Args:
+        history_len: 历史张量保留的最近出牌手数 K
+    """
+
+    def __init__(self, history_len: int = HISTORY_LEN):
+        self.history_len = history_len
+        self.shapes: Dict[str, Tuple[int, ...]] = {
+            'hand': (NUM_RANKS,),
+            'unseen': (NUM_RANKS,),
+            'played': (NUM_SEATS, NUM_RANKS),
+            'cards_left': (NUM_SEATS,),
+            'role': (NUM_SEATS,),
+            'last_move': (NUM_RANKS,),
+            'last_type': (NUM_TYPES,),
+            'last_seat': (NUM_SEATS,),
+            'history': (history_len, NUM_RANKS),
+            'history_seat': (history_len, NUM_SEATS),
+        }
+        # 各段在特征向量中的切片
+        self.slices: Dict[str, slice] = {}
+        offset = 0
+        for name, shape in self.shapes.items():
+            size = int(np.prod(shape))
+            self.slices[name] = slice(offset, offset + size)
+            offset += size
+        self.size = offset
+
+    def encode(self, env: Env, player: Optional[str] = None, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        编码 player（默认为当前玩家）视角的观察，返回长度为 self.size 的 float32 向量
+        out 为预先分配的输出向量（例如批量数组的一行），提供时原地写入
+        """
+        if out is None:
+            out = np.empty(self.size, dtype=np.float32)
+        out.fill(0)
+        viewer = PLAYERS.index(player or env.current_player)
+        seats = [(viewer + k) % NUM_SEATS for k in range(NUM_SEATS)]
+        view = self.view(out)
+        tracker = env.tracker.state
+        hand = env.hand_counts[PLAYERS[viewer]]
+
+        view['hand'][:] = hand
+        view['unseen'][:] = tracker.remaining
+        view['unseen'] -= view['hand']
+        for k, seat in enumerate(seats):
+            view['played'][k] = tracker.played[seat]
+            view['cards_left'][k] = sum(env.hand_counts[PLAYERS[seat]])
+        view['role'][seats.index(LANDLORD)] = 1
+
+        view['last_move'][:] = COUNTS[env.last_move]
+        view['last_type'][MOVE_TYPE[env.last_move]] = 1
+        if tracker.leader >= 0:
+            view['last_seat'][(tracker.leader - viewer) % NUM_SEATS] = 1
+
+        events = env.events
+        start = max(0, len(events) - self.history_len)
+        recent = events.moves[start:]
+        if recent:
+            rows = self.history_len - len(recent)
+            view['history'][rows:] = COUNTS[np.frombuffer(recent, dtype=np.uint16)]
+            relative = (np.frombuffer(events.seats[start:], dtype=np.uint8).astype(np.int64) - viewer) % NUM_SEATS
+            view['history_seat'][np.arange(rows, self.history_len), relative] = 1
+        return out
+
+    def encode_batch(self, envs: Sequence[Env], players: Optional[Sequence[str]] = None) -> np.ndarray:
+        """批量编码多局的观察，返回 (B, self.size) 的 float32 数组"""
+        batch = np.empty((len(envs), self.size), dtype=np.float32)
+        for i, env in enumerate(envs):
+            self.encode(env, players[i] if players is not None else None, out=batch[i])
+        return batch
+
+    def view(self, features: np.ndarray) -> Dict[str, np.ndarray]:
+        """特征向量（或批量数组）按段拆分的视图，不复制数据"""
+        lead = features.shape[:-1]
+        return {name: features[..., self.slices[name]].reshape(lead + shape)
+                for name, shape in self.shapes.items()}
+
+
+if __name__ == '__main__':
+    import random
+    import time
+
+    random.seed(0)
+    encoder = ObservationEncoder()
+    print(f"特征维度: {encoder.size}")
+    envs: List[Env] = []
+    for _ in range(1000):
+        env = Env()
+        env.reset()
+        for _ in range(random.randint(0, 30)):
+            if env.game_over():
+                break
+            env.step(env.current_player, random.choice(env.legal_moves()))
+        envs.append(env)
+    start = time.perf_counter()
+    batch = encoder.encode_batch(envs)
+    elapsed = time.perf_counter() - start
+    print(f"批量编码 {len(envs)} 局: {batch.shape}, {elapsed / len(envs) * 1e6:.1f}us/局")
+    sample = encoder.view(batch[0])
+    print("第一局手牌:", sample['hand'].astype(int), "剩余张数:", sample['cards_left'].astype(int))
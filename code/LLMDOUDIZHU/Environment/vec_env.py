@@ -0,0 +1,206 @@
+"""
+批量环境：以 NumPy 结构数组同时推进 B 局斗地主（需要 numpy）
+
+每局的状态按字段存放在长度为 B（或 (B, 3, 15)）的数组中，step 一次性结算所有对局，
+出牌的合法性与大小比较与 Env / CardValidator 完全一致（见 batch_mask.beats 与 batch_mask.legal_mask）。
+座位编号 0, 1, 2 依次对应 PLAYERS 中的地主、农民甲、农民乙，出牌用 move_table 的出牌ID表示。
+发牌与 Env 相同，由种子流派生的种子经 doudizhu.deal 确定：seeds[i] 为第 i 局当前这一副牌的种子，
+Env().reset(seeds[i]) 得到同一副牌，同样的出牌序列在两边打出相同的对局。
+"""
+import random
+from typing import Optional, Tuple
+
+import numpy as np
+
+from . import batch_mask
+from .card_validator import NUM_RANKS
+from .doudizhu import deal
+from .move_table import NUM_MOVES, PASS_ID
+from .seeding import SeedStream
+
+NUM_SEATS = 3
+LANDLORD = 0
+# random_actions 对没有合法出牌的行（已结束的对局）给出的动作，step 对已结束的对局不检查出牌
+NO_ACTION = -1
+
+
+class VecEnv:
+    """
+    B 局并行的斗地主环境
+
+    状态数组：
+        hands: (B, 3, 15) 各座位手牌计数
+        current: (B,) 当前出牌的座位
+        last_move: (B,) 最后一次有效出牌的ID，PASS_ID 表示本轮首出
+        pass_count: (B,) 连续PASS计数
+        round: (B,) 当前回合数
+        bottom: (B, 15) 底牌计数
+        seeds: (B,) 当前这一副牌的发牌种子
+        done: (B,) 已经结束、等待 reset 的对局（auto_reset 时总为 False）
+    """
+
+    def __init__(self, num_envs: int, seed: Optional[int] = None, auto_reset: bool = True):
+        """
+        Args:
+            num_envs: 并行对局数 B
+            seed: 根种子，第 k 次发牌使用种子流中的第 k 个种子；为 None 时随机选取根种子
+            auto_reset: 为 True 时结束的对局在 step 中立即重新发牌
+        """
+        self.seed_stream = SeedStream(seed if seed is not None else random.getrandbits(63))
+        self.dealt = 0
+        self.auto_reset = auto_reset
+        self.reset(num_envs)
+
+    def reset(self, num_envs: Optional[int] = None) -> np.ndarray:
+        """重新发牌开始 num_envs 局（默认保持当前局数），返回各局的合法出牌掩码"""
+        if num_envs is not None:
+            self.num_envs = num_envs
+        n = self.num_envs
+        self.hands = np.zeros((n, NUM_SEATS, NUM_RANKS), dtype=np.int8)
+        self.bottom = np.zeros((n, NUM_RANKS), dtype=np.int8)
+        self.current = np.zeros(n, dtype=np.int8)
+        self.last_move = np.zeros(n, dtype=np.int64)
+        self.pass_count = np.zeros(n, dtype=np.int8)
+        self.round = np.zeros(n, dtype=np.int32)
+        self.seeds = np.zeros(n, dtype=np.uint64)
+        self.done = np.zeros(n, dtype=bool)
+        self._deal(np.arange(n))
+        return self.legal_mask()
+
+    def _deal(self, envs: np.ndarray):
+        """给 envs 中的对局按种子流中接下来的种子重新发牌（与 Env.reset(seed) 相同）：每人17张，地主另得3张底牌"""
+        seeds = self.seed_stream.seeds(self.dealt, len(envs))
+        self.dealt += len(envs)
+        for env, seed in zip(envs, seeds):
+            hands, bottom = deal(seed)
+            self.hands[env] = hands
+            self.bottom[env] = bottom
+        self.seeds[envs] = seeds
+        self.current[envs] = LANDLORD
+        self.last_move[envs] = PASS_ID
+        self.pass_count[envs] = 0
+        self.round[envs] = 0
+        self.done[envs] = False
+
+    def current_hands(self) -> np.ndarray:
+        """(B, 15) 各局当前出牌座位的手牌"""
+        return self.hands[np.arange(self.num_envs), self.current]
+
+    def cards_left(self) -> np.ndarray:
+        """(B, 3) 各座位剩余张数"""
+        return self.hands.sum(axis=2)
+
+    def legal_mask(self) -> np.ndarray:
+        """(B, NUM_MOVES) 当前出牌座位的合法出牌掩码，与 Env.legal_moves 给出的集合一致；已结束的对局全为 False"""
+        mask = batch_mask.legal_mask(self.current_hands(), self.last_move)
+        mask[self.done] = False
+        return mask
+
+    def is_legal(self, actions: np.ndarray) -> np.ndarray:
+        """(B,) 各局的出牌是否合法：出牌ID有效、手中有这些牌、能压过上一手（首出不能PASS）"""
+        actions = np.asarray(actions, dtype=np.int64)
+        valid = (actions >= 0) & (actions < NUM_MOVES)
+        actions = np.where(valid, actions, PASS_ID)
+        owned = batch_mask.contains(batch_mask.pack_counts(self.current_hands()), batch_mask.MOVES_PACKED[actions])
+        return valid & owned & batch_mask.beats(actions, self.last_move)
+
+    def step(self, actions: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        所有对局同时出牌
+
+        Args:
+            actions: (B,) 各局当前座位的出牌ID，已结束的对局（done 为真）可以是任意值，不检查也不推进
+
+        Returns:
+            (mask, done, winner)：mask 为下一步各局当前座位的合法出牌掩码（同 legal_mask()），
+            done[i] 表示第 i 局在这一步结束，winner[i] 为出完牌的座位，未结束为 -1。
+            auto_reset 时结束的对局已经重新发牌，mask 中对应的行属于新的一局；
+            不自动重新发牌时已结束对局的行全为 False，之后的 step 中这些对局保持不变，直到 reset
+
+        Raises:
+            ValueError: 有未结束对局的出牌不合法
+        """
+        actions = np.asarray(actions, dtype=np.int64)
+        active = ~self.done
+        illegal = np.flatnonzero(active & ~self.is_legal(actions))
+        if len(illegal):
+            raise ValueError(f"第 {illegal.tolist()} 局出牌不合法: {actions[illegal].tolist()}")
+
+        envs = np.arange(self.num_envs)
+        seats = self.current.astype(np.int64)
+        # 已结束的对局按 PASS 结算手牌（不变），其余状态保持原值
+        actions = np.where(active, actions, PASS_ID)
+        self.hands[envs, seats] -= batch_mask.COUNTS[actions].astype(np.int8)
+
+        passed = actions == PASS_ID
+        pass_count = np.where(passed, self.pass_count + 1, 0).astype(np.int8)
+        # 连续两家PASS，下家可以出任意牌
+        new_round = pass_count >= 2
+        last_move = np.where(passed, np.where(new_round, PASS_ID, self.last_move), actions)
+        pass_count[new_round] = 0
+        self.pass_count = np.where(active, pass_count, self.pass_count).astype(np.int8)
+        self.last_move = np.where(active, last_move, self.last_move)
+        self.round += new_round & active
+        self.current = np.where(active, (seats + 1) % NUM_SEATS, seats).astype(np.int8)
+
+        done = active & ~self.hands[envs, seats].any(axis=1)
+        winner = np.where(done, seats, -1)
+        if self.auto_reset:
+            if done.any():
+                self._deal(np.flatnonzero(done))
+        else:
+            self.done |= done
+        return self.legal_mask(), done, winner
+
+
+def random_actions(mask: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """在每行的合法出牌中均匀随机选择一个，返回 (B,) 出牌ID；全为 False 的行（已结束的对局）为 NO_ACTION"""
+    # 一维 flatnonzero 比二维 nonzero 快一个数量级
+    flat = np.flatnonzero(mask)
+    counts = np.bincount(flat // mask.shape[1], minlength=mask.shape[0])
+    offsets = np.cumsum(counts) - counts
+    choice = offsets + (rng.random(mask.shape[0]) * counts).astype(np.int64)
+    actions = np.full(mask.shape[0], NO_ACTION, dtype=np.int64)
+    playing = counts > 0
+    actions[playing] = flat[choice[playing]] % mask.shape[1]
+    return actions
+
+
+if __name__ == '__main__':
+    import time
+
+    num_envs, num_games = 512, 5000
+    env = VecEnv(num_envs, seed=0)
+    rng = np.random.default_rng(1)
+    finished, landlord_wins, steps = 0, 0, 0
+
+    start = time.perf_counter()
+    mask = env.legal_mask()
+    while finished < num_games:
+        mask, done, winner = env.step(random_actions(mask, rng))
+        finished += int(done.sum())
+        landlord_wins += int((winner == LANDLORD).sum())
+        steps += num_envs
+    elapsed = time.perf_counter() - start
+    print(f"{num_envs} 局并行，随机代理完成 {finished} 局: {elapsed:.2f}s, "
+          f"{finished / elapsed:.0f} 局/秒, {steps / elapsed:.0f} 步/秒, 地主胜率 {landlord_wins / finished:.2%}")
+
+    # 不自动重新发牌：结束的对局保持不变，所有对局结束后与 Env 逐局核对
+    from .doudizhu import Env, PLAYERS
+    env = VecEnv(64, seed=1, auto_reset=False)
+    mask = env.legal_mask()
+    moves, winners = [[] for _ in range(env.num_envs)], np.full(env.num_envs, -1)
+    while not env.done.all():
+        actions = random_actions(mask, rng)
+        assert ((actions == NO_ACTION) == env.done).all()
+        for i in np.flatnonzero(~env.done):
+            moves[i].append(int(actions[i]))
+        mask, done, winner = env.step(actions)
+        winners[done] = winner[done]
+    for i in range(env.num_envs):
+        game = Env()
+        game.reset(int(env.seeds[i]))
+        for move in moves[i]:
+            assert game.step(game.current_player, move)[0]
+        assert game.game_over() and PLAYERS.index(game.current_player) == (winners[i] + 1) % NUM_SEATS
+    print(f"auto_reset=False: {env.num_envs} 局全部结束，与 Env 重放一致")
@@ -0,0 +1,255 @@
+"""
+卡牌引擎热点路径的基准测试
+
+在固定种子的语料上逐项计时：
+    identify      CardValidator.identify_card_type（实际出牌与从手牌中随机抽取的牌，含无效牌型）
+    can_beat      CardValidator.can_beat（跟牌局面下的实际出牌与随机抽取的牌）
+    hint_all      CardValidator.hint_all（首出局面）
+    hint_all_deal CardValidator.hint_all（发牌后的整手牌：地主20张、农民17张）
+    hint          CardValidator.hint（跟牌局面）
+    env_reset / env_step / env_observe   按语料对局重放 Env.reset、Env.step 与出牌后的首次 Env.Observe
+语料由规则代理按种子自我对局生成，覆盖首出与跟牌、地主与农民、从整手牌到残局的各种手牌张数。
+
+每项操作报告单次调用延迟的分布（每个输入重复 --repeat 次取最小值）、动作空间大小的分布，
+以及全部输出的摘要。结果保存为JSON，并与基线对比（默认为仓库中的 benchmark_baseline.json）：
+输出摘要不同记为不一致；基线在同一平台、同一 Python 版本上生成时，中位延迟变慢超过 --tolerance 记为退步，
+其他机器上的延迟只列出作参考。出现任一问题时返回码为1。
+
+用法示例：
+    python benchmark.py                                   # 与仓库中的基线对比
+    python benchmark.py --output benchmark_baseline.json  # 引擎有意改变输出或换机器后重新生成基线
+    python benchmark.py --baseline '' --output current.json
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import random
+import sys
+import time
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from Agent.fast_agents import RuleAgent
+from Environment.card_validator import CardValidator
+from Environment.doudizhu import Env, PLAYERS
+from Environment.move_table import move_cards
+from Environment.seeding import SeedStream
+
+CORPUS_SEED = 20240601
+# 仓库中保存的基线（默认参数生成）
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+
+# 各项操作的输入构造：语料 -> 参数元组列表
+Corpus = Dict[str, list]
+
+
+def build_corpus(games: int, seed: int = CORPUS_SEED) -> Corpus:
+    """
+    用规则代理按种子打 games 局，收集每一步的局面
+    返回 {'lead': [(手牌, )], 'follow': [(手牌, 上一手)], 'deal': [(手牌, )],
+          'identify': [(牌, )], 'can_beat': [(牌, 上一手)], 'games': [(种子, 出牌ID序列)]}
+    """
+    deals, samples = SeedStream(seed).spawn(2)
+    rng = random.Random(samples.seed(0))
+    agents = {player: RuleAgent(player) for player in PLAYERS}
+    corpus: Corpus = {'lead': [], 'follow': [], 'deal': [], 'identify': [], 'can_beat': [], 'games': []}
+    env = Env()
+    for deal_seed in deals.seeds(0, games):
+        env.reset(deal_seed)
+        corpus['deal'].extend((hand,) for hand in env.hands.values())
+        moves = []
+        while not env.game_over():
+            player = env.current_player
+            hand = env.hands[player]
+            last = env.last_valid_play
+            move = agents[player].act(env)
+            played = move_cards(move)
+            sample = rng.sample(hand, rng.randint(1, min(5, len(hand))))
+            corpus['identify'].extend([(played,), (sample,)])
+            if last:
+                corpus['follow'].append((hand, last))
+                corpus['can_beat'].extend([(played, last), (sample, last)])
+            else:
+                corpus['lead'].append((hand,))
+            env.step(player, move)
+            moves.append(move)
+        corpus['games'].append((deal_seed, moves))
+    return corpus
+
+
+def time_calls(fn: Callable, inputs: Sequence[tuple], repeat: int) -> Tuple[List[float], list]:
+    """逐个输入计时，返回 (每个输入的最小单次耗时（微秒）, 各输入的输出)"""
+    best = [float('inf')] * len(inputs)
+    outputs = []
+    clock = time.perf_counter_ns
+    for r in range(repeat):
+        for i, args in enumerate(inputs):
+            start = clock()
+            out = fn(*args)
+            elapsed = clock() - start
+            if elapsed < best[i]:
+                best[i] = elapsed
+            if r == 0:
+                outputs.append(out)
+    return [ns / 1000 for ns in best], outputs
+
+
+def time_env(games: Sequence[Tuple[int, List[int]]], repeat: int) -> Dict[str, Tuple[List[float], list]]:
+    """重放语料对局，对 reset、每一步 step 以及 step 之后的首次 Observe 计时"""
+    clock = time.perf_counter_ns
+    results = {name: ([], []) for name in ('env_reset', 'env_step', 'env_observe')}
+    for r in range(repeat):
+        index = {name: 0 for name in results}
+        env = Env()
+
+        def record(name, elapsed, out):
+            times, outputs = results[name]
+            i = index[name]
+            if r == 0:
+                times.append(elapsed / 1000)
+                outputs.append(out)
+            else:
+                times[i] = min(times[i], elapsed / 1000)
+            index[name] = i + 1
+
+        for seed, moves in games:
+            start = clock()
+            env.reset(seed)
+            record('env_reset', clock() - start, env.seed)
+            for move in moves:
+                player = env.current_player
+                start = clock()
+                out = env.step(player, move)
+                record('env_step', clock() - start, out)
+                if env.game_over():
+                    break
+                start = clock()
+                current_player, hand, action_space, history, state = env.Observe()
+                elapsed = clock() - start
+                record('env_observe', elapsed, (current_player, hand, action_space, state))
+    return results
+
+
+def summarize(times: List[float], outputs: list, sizes: List[int] = None) -> Dict[str, object]:
+    """延迟分布（微秒）、动作空间大小分布与输出摘要"""
+    ordered = sorted(times)
+
+    def pct(values, q):
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+    result = {
+        'count': len(times),
+        'mean_us': sum(times) / len(times),
+        'p50_us': pct(ordered, 0.50),
+        'p90_us': pct(ordered, 0.90),
+        'p99_us': pct(ordered, 0.99),
+        'max_us': ordered[-1],
+        'total_ms': sum(times) / 1000,
+        'digest': hashlib.sha256(repr(outputs).encode('utf-8')).hexdigest()[:16],
+    }
+    if sizes:
+        ordered_sizes = sorted(sizes)
+        result['actions'] = {
+            'mean': sum(sizes) / len(sizes),
+            'p50': pct(ordered_sizes, 0.50),
+            'p90': pct(ordered_sizes, 0.90),
+            'max': ordered_sizes[-1],
+        }
+    return result
+
+
+def run(games: int, repeat: int, seed: int = CORPUS_SEED) -> Dict[str, object]:
+    """构造语料并运行全部基准，返回可写入JSON的结果"""
+    corpus = build_corpus(games, seed)
+    ops = {
+        'identify': (CardValidator.identify_card_type, corpus['identify']),
+        'can_beat': (CardValidator.can_beat, corpus['can_beat']),
+        'hint_all': (CardValidator.hint_all, corpus['lead']),
+        'hint_all_deal': (CardValidator.hint_all, corpus['deal']),
+        'hint': (lambda hand, last: list(CardValidator.hint(hand, last)), corpus['follow']),
+    }
+    results = {}
+    for name, (fn, inputs) in ops.items():
+        times, outputs = time_calls(fn, inputs, repeat)
+        sizes = [len(out) for out in outputs] if name.startswith('hint') else None
+        results[name] = summarize(times, outputs, sizes)
+    for name, (times, outputs) in time_env(corpus['games'], repeat).items():
+        sizes = [len(out[2]) for out in outputs] if name == 'env_observe' else None
+        results[name] = summarize(times, outputs, sizes)
+    return {
+        'meta': {
+            'corpus_seed': seed,
+            'games': games,
+            'repeat': repeat,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+        },
+        'results': results,
+    }
+
+
+def compare(current: Dict[str, object], baseline: Dict[str, object], tolerance: float) -> List[str]:
+    """
+    与基线对比，返回问题列表（输出不一致，或同一机器上的中位延迟退步）
+    基线的平台或 Python 版本与当前不同时延迟不可比，只列出不作判断
+    """
+    problems = []
+    if (current['meta']['corpus_seed'], current['meta']['games']) != \
+            (baseline['meta']['corpus_seed'], baseline['meta']['games']):
+        problems.append("语料与基线不同（种子或局数不一致），无法对比")
+        return problems
+    same_machine = all(current['meta'][key] == baseline['meta'][key] for key in ('python', 'platform'))
+    if not same_machine:
+        print(f"基线生成于 {baseline['meta']['platform']} / Python {baseline['meta']['python']}，延迟仅供参考")
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        ratio = result['p50_us'] / base['p50_us'] if base['p50_us'] else 1.0
+        print(f"{name:<14} 中位延迟 {base['p50_us']:9.2f}us -> {result['p50_us']:9.2f}us  ({ratio:.2f}x)")
+        if same_machine and ratio > 1 + tolerance:
+            problems.append(f"{name}: 中位延迟退步 {ratio:.2f}x")
+        if result['digest'] != base['digest']:
+            problems.append(f"{name}: 输出与基线不一致 ({base['digest']} -> {result['digest']})")
+    return problems
+
+
+def print_report(report: Dict[str, object]):
+    print(f"{'操作':<14}{'次数':>8}{'平均us':>10}{'p50':>10}{'p90':>10}{'p99':>10}{'最大':>10}  动作空间(平均/p90/最大)")
+    for name, result in report['results'].items():
+        line = (f"{name:<14}{result['count']:>8}{result['mean_us']:>10.2f}{result['p50_us']:>10.2f}"
+                f"{result['p90_us']:>10.2f}{result['p99_us']:>10.2f}{result['max_us']:>10.1f}")
+        actions = result.get('actions')
+        if actions:
+            line += f"  {actions['mean']:.1f}/{actions['p90']}/{actions['max']}"
+        print(line)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="卡牌引擎热点路径的基准测试")
+    parser.add_argument('--games', type=int, default=100, help="语料对局数")
+    parser.add_argument('--repeat', type=int, default=3, help="每个输入的重复次数（取最小值）")
+    parser.add_argument('--seed', type=int, default=CORPUS_SEED, help="语料种子")
+    parser.add_argument('--output', default=None, help="结果JSON的保存路径")
+    parser.add_argument('--baseline', default=BASELINE, help="用于对比的基线JSON，为空字符串时不对比")
+    parser.add_argument('--tolerance', type=float, default=0.10, help="中位延迟允许变慢的比例")
+    args = parser.parse_args()
+
+    report = run(args.games, args.repeat, args.seed)
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.baseline and os.path.abspath(args.baseline) == os.path.abspath(args.output or ''):
+        print(f"已更新基线 {args.baseline}")
+    elif args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        problems = compare(report, baseline, args.tolerance)
+        for problem in problems:
+            print(f"❌ {problem}")
+        if problems:
+            sys.exit(1)
+        print("✅ 与基线相比没有退步，输出一致")
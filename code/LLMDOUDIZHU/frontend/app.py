@@ -12,8 +12,12 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from Agent.base_agent import BaseAgent
+from Agent.decision_cache import DecisionCache
+from Agent.fast_agents import fallback_decision
 from Agent.llm_client import AgentsLLM
-from Environment.doudizhu import Env
+from Agent.speculation import SpeculativeExecutor
+from Environment.doudizhu import Env, PLAYERS
+from Environment.game_record import GameRecord, RecordWriter
 from Agent.human_agent import HumanAgent
 
 app = Flask(__name__)
@@ -25,6 +29,22 @@ socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
 game_env = None
 players = {}
 current_game_state = {}
+# 对局记录：每局结束后追加一条二进制记录
+recorder = RecordWriter(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'records'))
+# AI玩家共享的决策缓存，相同局面不重复调用LLM
+decision_cache = DecisionCache(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cache',
+                                            'decisions.sqlite'))
+# 推测执行：当前玩家思考时，提前为下一个AI玩家计算最可能局面下的决策
+speculator = SpeculativeExecutor()
+
+
+def speculate_next():
+    """局面推进后调用：下一名玩家是AI时，对当前玩家最可能的出牌提前计算其决策"""
+    if not game_env or game_env.game_over():
+        return
+    next_player = PLAYERS[(PLAYERS.index(game_env.current_player) + 1) % len(PLAYERS)]
+    if isinstance(players.get(next_player), BaseAgent):
+        speculator.speculate(game_env, players[next_player])
 
 
 @app.route('/')
@@ -46,6 +66,7 @@ def start_game():
     })
     
     # 初始化环境
+    speculator.cancel_all()
     game_env = Env()
     game_env.reset()
     
@@ -55,7 +76,8 @@ def start_game():
         if player_type == 'human':
             players[player_name] = HumanAgent(name=player_name)
         else:
-            players[player_name] = BaseAgent(name=player_name, llm_client=AgentsLLM)
+            players[player_name] = BaseAgent(name=player_name, llm_client=AgentsLLM, env=game_env,
+                                             cache=decision_cache)
     
     # 获取初始状态
     current_player, hand, action_space, history, state = game_env.Observe()
@@ -80,6 +102,7 @@ def start_game():
     
     # 广播游戏开始
     socketio.emit('game_started', current_game_state)
+    speculate_next()
     
     # 如果当前玩家是AI，自动出牌
     if player_types[current_player] == 'ai':
@@ -134,6 +157,7 @@ def handle_player_action(data):
     # 更新游戏状态
     if game_env.game_over():
         current_game_state['game_over'] = True
+        recorder.write(GameRecord.from_env(game_env))
         current_game_state['winner'] = player
         socketio.emit('game_over', {
             'winner': player,
@@ -160,6 +184,7 @@ def handle_player_action(data):
         })
         
         socketio.emit('game_updated', current_game_state)
+        speculate_next()
         
         # 如果下一个玩家是AI，自动出牌
         if isinstance(players[current_player], BaseAgent):
@@ -175,9 +200,17 @@ def ai_make_decision():
     
     current_player, hand, action_space, history, state = game_env.Observe()
     
-    # 获取AI决策
+    # 获取AI决策：上一家的出牌与推测的分支相同时直接采用推测结果
     agent = players[current_player]
-    decision = agent.make_decision(history, state, hand, err_msg=None, action_space=action_space)
+    decision = None
+    future = speculator.take(game_env)
+    if future is not None:
+        try:
+            decision = future.result()
+        except Exception as e:
+            print(f"⚠️  {current_player} 推测决策出错: {e}")
+    if decision is None:
+        decision = agent.make_decision(history, state, hand, err_msg=None, action_space=action_space)
     
     # 执行出牌
     out = game_env.step(current_player, decision)
@@ -189,16 +222,16 @@ def ai_make_decision():
         out = game_env.step(current_player, decision)
         retry_count += 1
     
-    # 如果重试3次仍失败，从动作空间随机选择
+    # 如果重试3次仍失败，由拆牌代理兜底出牌
     if not out[0] and action_space:
-        import random
-        decision = random.choice(action_space)
+        decision = fallback_decision(current_player, hand, action_space, game_env)
         out = game_env.step(current_player, decision)
-        print(f"⚠️  {current_player} AI重试3次失败，随机选择: {decision}")
+        print(f"⚠️  {current_player} AI重试3次失败，兜底出牌: {decision}")
     
     # 更新状态
     if game_env.game_over():
         current_game_state['game_over'] = True
+        recorder.write(GameRecord.from_env(game_env))
         current_game_state['winner'] = current_player
         socketio.emit('game_over', {
             'winner': current_player,
@@ -229,6 +262,7 @@ def ai_make_decision():
         })
         
         socketio.emit('game_updated', current_game_state)
+        speculate_next()
         
         # 如果下一个玩家还是AI，继续
         if isinstance(players[current_player], BaseAgent):
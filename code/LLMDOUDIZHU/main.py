@@ -1,18 +1,26 @@
 from Agent.base_agent import BaseAgent
+from Agent.decision_cache import DecisionCache
 from Agent.llm_client import AgentsLLM
 from Environment.doudizhu import Env
+from Environment.game_record import GameRecord, RecordWriter
 from Agent.human_agent import HumanAgent
+from Agent.fast_agents import PlanAgent
+from Agent.monte_carlo_agent import MonteCarloAgent
 from utils import logger
 
 
 llm_client = AgentsLLM
 env = Env()
 env.reset()
+recorder = RecordWriter("records")  # 每局结束后追加一条二进制对局记录，可用 game_record.replay 重放
+cache = DecisionCache("cache/decisions.sqlite")  # AI玩家共享的决策缓存，相同局面不重复调用LLM
 
-# 配置玩家类型：可以选择 BaseAgent(AI) 或 HumanAgent(人类)
+# 配置玩家类型：可以选择 BaseAgent(AI)、MonteCarloAgent(本地搜索，不调用LLM)、PlanAgent(拆牌规则，不调用LLM) 或 HumanAgent(人类)
+# 例如 farmerA = MonteCarloAgent(name="农民甲", env=env, time_budget=1.0, workers=4)
+#      farmerB = PlanAgent(name="农民乙", env=env)
 landlord = HumanAgent(name="地主")  # 地主由人类控制
-farmerA = BaseAgent(name="农民甲", llm_client=llm_client)  # 农民甲由AI控制
-farmerB = BaseAgent(name="农民乙", llm_client=llm_client)  # 农民乙由AI控制
+farmerA = BaseAgent(name="农民甲", llm_client=llm_client, env=env, cache=cache)  # 农民甲由AI控制
+farmerB = BaseAgent(name="农民乙", llm_client=llm_client, env=env, cache=cache)  # 农民乙由AI控制
 
 
 current_player:str
@@ -49,7 +57,13 @@ while not env.game_over():
     if env.game_over():
         logger.info(f"游戏结束，{current_player}获胜！")
         env.render()
+        recorder.write(GameRecord.from_env(env))
         break
     
 
 
+
+# 蒙特卡洛代理的进程池在对局结束后关闭
+for agent in (landlord, farmerA, farmerB):
+    if isinstance(agent, MonteCarloAgent):
+        agent.close()
@@ -0,0 +1,174 @@
+"""
+无界面的批量自我对局模拟器
+
+使用快速代理（random / greedy / rule）或蒙特卡洛代理（mc）完整地打 N 局斗地主，对局循环中没有任何I/O，
+多局对局分块后分发到进程池，最后汇总每秒局数与胜率。
+第 i 局的发牌种子由根种子派生的种子流决定（见 Environment/seeding.py），与分块大小和进程数无关；
+指定 --mirror 时每副牌按轮换座次各打一局，每个代理都在每个座位上打过同一副牌，用于方差更小的代理对比。
+指定 --record 时把每局的二进制对局记录（见 Environment/game_record.py）写入该目录。
+
+用法示例：
+    python simulate.py --games 100000 --workers 8 --agents rule random random --seed 42
+    python simulate.py --games 10000 --agents mc rule rule --mirror
+"""
+import argparse
+import time
+from multiprocessing import Pool
+from typing import Dict, List, Tuple
+
+from Agent.fast_agents import FAST_AGENTS
+from Agent.monte_carlo_agent import MonteCarloAgent
+from Environment import hand_solver
+from Environment.doudizhu import Env, PLAYERS
+from Environment.game_record import GameRecord, RecordWriter
+from Environment.seeding import SeedStream
+
+
+def play_game(env: Env, agents: Dict[str, object], seed: int = None) -> Tuple[str, int, Dict[str, int]]:
+    """用种子 seed 发牌打完一局，返回 (获胜玩家, 出牌步数, 各玩家起手牌的最少出完手数)"""
+    env.reset(seed)
+    start_plays = {player: hand_solver.min_plays(counts) for player, counts in env.hand_counts.items()}
+    steps = 0
+    while True:
+        player = env.current_player
+        ok, message = env.step(player, agents[player].act(env))
+        if not ok:
+            raise RuntimeError(message)
+        steps += 1
+        if env.game_over():
+            return player, steps, start_plays
+
+
+def make_agent(name: str, player: str, seed: int, mc_budget: float):
+    """按名称创建代理：快速代理或每步搜索 mc_budget 秒的蒙特卡洛代理（单进程）"""
+    if name == 'mc':
+        return MonteCarloAgent(player, time_budget=mc_budget, seed=seed)
+    return FAST_AGENTS[name](player, seed=seed)
+
+
+def lineups(agent_names: List[str], mirror: bool) -> List[List[int]]:
+    """
+    座次安排：每项为各座位（按 PLAYERS 顺序）上的代理编号
+    不轮换时只有原座次；轮换时第 k 种座次中第 i 个代理坐在座位 (i + k) % 3
+    """
+    rotations = len(PLAYERS) if mirror else 1
+    return [[(seat - k) % len(PLAYERS) for seat in range(len(PLAYERS))] for k in range(rotations)]
+
+
+def run_chunk(args: Tuple[int, int, int, List[str], float, bool, bool]) -> Dict[str, int]:
+    """
+    工作进程：打第 start 副起的 games 副牌，返回统计结果
+    mirror 为真时每副牌按轮换座次各打一局；record 为真时 'records' 项为编码后的对局记录
+    """
+    start, games, seed, agent_names, mc_budget, record, mirror = args
+    deals, agent_seeds = SeedStream(seed).spawn(2)
+    agent_seeds = agent_seeds.child(start)
+    seatings = []
+    for k, seating in enumerate(lineups(agent_names, mirror)):
+        agents = {player: make_agent(agent_names[i], player, agent_seeds.seed(k * len(PLAYERS) + i), mc_budget)
+                  for player, i in zip(PLAYERS, seating)}
+        seatings.append((seating, agents))
+    env = Env()
+    stats = {'games': 0, 'landlord_wins': 0, 'steps': 0}
+    stats.update({player: 0 for player in PLAYERS})
+    stats.update({f'{player}_plays': 0 for player in PLAYERS})
+    stats.update({f'agent{i}_wins': 0 for i in range(len(agent_names))})
+    records = []
+    for deal_seed in deals.seeds(start, games):
+        for seating, agents in seatings:
+            winner, steps, start_plays = play_game(env, agents, deal_seed)
+            if record:
+                records.append(GameRecord.from_env(env).encode())
+            stats['games'] += 1
+            stats['steps'] += steps
+            stats[winner] += 1
+            for player, plays in start_plays.items():
+                stats[f'{player}_plays'] += plays
+            if winner == "地主":
+                stats['landlord_wins'] += 1
+            # 与获胜者同一方的代理都记一胜
+            for player, i in zip(PLAYERS, seating):
+                if (player == "地主") == (winner == "地主"):
+                    stats[f'agent{i}_wins'] += 1
+    if record:
+        stats['records'] = b''.join(records)
+    return stats
+
+
+def simulate(games: int, agent_names: List[str], workers: int = 1, seed: int = 0,
+             chunk_size: int = 1000, mc_budget: float = 0.05, record_dir: str = None,
+             mirror: bool = False) -> Dict[str, float]:
+    """
+    模拟 games 局对局并汇总结果
+
+    Args:
+        games: 发牌的副数，不轮换座次时即为总局数
+        agent_names: 地主、农民甲、农民乙使用的快速代理名称
+        workers: 进程数，为1时在当前进程中运行
+        seed: 根种子，发牌与代理的种子都由它派生，同一根种子的结果可以复现
+        chunk_size: 每个分块的发牌副数
+        mc_budget: 蒙特卡洛代理每步的搜索时间（秒）
+        record_dir: 对局记录目录，为 None 时不记录
+        mirror: 每副牌按轮换座次各打一局（共 3 × games 局）
+    """
+    chunks = []
+    remaining = games
+    while remaining > 0:
+        size = min(chunk_size, remaining)
+        chunks.append((games - remaining, size, seed, agent_names, mc_budget, record_dir is not None, mirror))
+        remaining -= size
+
+    start = time.perf_counter()
+    if workers > 1:
+        with Pool(workers) as pool:
+            results = list(pool.imap_unordered(run_chunk, chunks))
+    else:
+        results = [run_chunk(chunk) for chunk in chunks]
+    elapsed = time.perf_counter() - start
+    if record_dir is not None:
+        with RecordWriter(record_dir) as writer:
+            for result in results:
+                writer.write_encoded(result.pop('records'))
+
+    total = {key: sum(result[key] for result in results) for key in results[0]}
+    summary = {
+        'games': total['games'],
+        'seconds': elapsed,
+        'games_per_sec': total['games'] / elapsed,
+        'avg_steps': total['steps'] / total['games'],
+        'landlord_win_rate': total['landlord_wins'] / total['games'],
+        'farmer_win_rate': 1 - total['landlord_wins'] / total['games'],
+    }
+    summary.update({f'{player}_finish_rate': total[player] / total['games'] for player in PLAYERS})
+    summary.update({f'{player}_start_plays': total[f'{player}_plays'] / total['games'] for player in PLAYERS})
+    summary.update({f'agent{i}_win_rate': total[f'agent{i}_wins'] / total['games'] for i in range(len(agent_names))})
+    return summary
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="斗地主无界面批量对局模拟")
+    parser.add_argument('--games', type=int, default=10000, help="总局数")
+    parser.add_argument('--workers', type=int, default=1, help="进程数")
+    parser.add_argument('--seed', type=int, default=0, help="根随机种子")
+    parser.add_argument('--chunk-size', type=int, default=1000, help="每个分块的局数")
+    parser.add_argument('--agents', nargs=3, default=['rule', 'rule', 'rule'],
+                        choices=sorted(FAST_AGENTS) + ['mc'], metavar='AGENT',
+                        help=f"地主、农民甲、农民乙的代理，可选 {sorted(FAST_AGENTS) + ['mc']}")
+    parser.add_argument('--mc-budget', type=float, default=0.05, help="蒙特卡洛代理每步的搜索时间（秒）")
+    parser.add_argument('--record', default=None, metavar='DIR', help="把每局的对局记录写入该目录")
+    parser.add_argument('--mirror', action='store_true', help="每副牌按轮换座次各打一局")
+    args = parser.parse_args()
+
+    summary = simulate(args.games, args.agents, args.workers, args.seed, args.chunk_size, args.mc_budget,
+                       args.record, args.mirror)
+    print(f"对局数: {summary['games']}  用时: {summary['seconds']:.2f}s  "
+          f"速度: {summary['games_per_sec']:.0f} 局/秒  平均步数: {summary['avg_steps']:.1f}")
+    if args.mirror:
+        print(f"地主 胜率: {summary['landlord_win_rate']:.2%}  农民 胜率: {summary['farmer_win_rate']:.2%}")
+    else:
+        print(f"地主({args.agents[0]}) 胜率: {summary['landlord_win_rate']:.2%}  "
+              f"农民({args.agents[1]}/{args.agents[2]}) 胜率: {summary['farmer_win_rate']:.2%}")
+    print("起手牌平均最少出完手数: " + "  ".join(f"{player} {summary[f'{player}_start_plays']:.2f}" for player in PLAYERS))
+    if args.mirror:
+        print("轮换座次后各代理胜率: " + "  ".join(
+            f"{name}#{i} {summary[f'agent{i}_win_rate']:.2%}" for i, name in enumerate(args.agents)))